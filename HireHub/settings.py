@@ -46,17 +46,29 @@ INSTALLED_APPS = [
     'rest_framework',
     'authentication',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'social_auth',
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
     'allauth.socialaccount.providers.google',
+    'allauth.socialaccount.providers.facebook',
     'dj_rest_auth',
     'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
+    'authentication.metrics.RequestMetricsMiddleware',
+    'authentication.profiling.SamplingProfilerMiddleware',
+    # allauth refuses to start unless this is listed here; it only sets up
+    # request.allauth, so it stays in front of both chains below.
     'allauth.account.middleware.AccountMiddleware',
+    'authentication.middleware.PathRoutedMiddleware',
+]
+
+# PathRoutedMiddleware runs these for the session-based pages under
+# FULL_MIDDLEWARE_PREFIXES...
+FULL_MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +77,18 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+FULL_MIDDLEWARE_PREFIXES = ['/admin/', '/accounts/', '/auth/']
+# ...and these for every other path, the JWT-authenticated API.
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    # The browsable API serves HTML on these paths too.
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# The admin checks look for its session, auth and messages middleware in
+# MIDDLEWARE; they run from FULL_MIDDLEWARE for /admin/ instead.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'HireHub.urls'
 
@@ -90,20 +114,80 @@ WSGI_APPLICATION = 'HireHub.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite set up for concurrent requests. In WAL mode reads never wait for
+# the writer; IMMEDIATE transactions take the write lock when they begin, so
+# concurrent writers queue for up to `timeout` seconds instead of failing
+# with "database is locked" halfway through. Connections are kept for
+# DB_CONN_MAX_AGE seconds and checked before reuse.
+SQLITE_INIT_COMMAND = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-32000',
+    'PRAGMA temp_store=MEMORY',
+])
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Optional read replica: a copy of db.sqlite3 that `manage.py
+# sync_sqlite_replica` refreshes every SQLITE_REPLICA_SYNC_INTERVAL seconds.
+# authentication.routers.ReplicaRouter sends reads of REPLICA_READ_MODELS
+# there (the public provider listing and search), everything else to the
+# primary. Each refresh copies the whole file, so it suits databases of up
+# to a few hundred MB; raise the interval as the database grows.
+SQLITE_REPLICA_PATH = os.getenv('SQLITE_REPLICA_PATH')
+SQLITE_REPLICA_SYNC_INTERVAL = float(os.getenv('SQLITE_REPLICA_SYNC_INTERVAL', 30))
+REPLICA_READ_MODELS = ['authentication.providerprofile']
+if SQLITE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SQLITE_REPLICA_PATH,
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + ';PRAGMA query_only=ON',
+            'timeout': 20,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['authentication.routers.ReplicaRouter']
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = f'HireHub <{EMAIL_HOST_USER}>'  
 
+# Outbox delivery (`manage.py send_queued_emails`)
+EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', 2))
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_LEASE_SECONDS = 300
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 3600
+
 SITE_ID = 1
+# Host used in links sent by email; defaults to the request's host.
+SITE_DOMAIN = os.getenv('SITE_DOMAIN')
+
+# Full-text provider search. Use 'authentication.search.DatabaseSearchBackend'
+# on databases without SQLite FTS5.
+PROVIDER_SEARCH_BACKEND = 'authentication.search.SQLiteFTSSearchBackend'
+
+# Offline gazetteer (CSV with name, latitude, longitude columns) used to
+# geocode ProviderProfile.location.
+GEO_GAZETTEER_PATH = os.getenv('GEO_GAZETTEER_PATH')
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -113,9 +197,68 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer', 'JWT'),
+    'AUTH_TOKEN_CLASSES': ('authentication.tokens.HireHubAccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.tokens.HireHubTokenRefreshSerializer',
 }
+
+# Asymmetric token signing (authentication.keyring). `manage.py rotate_jwt_keys`
+# creates the key ring file and, run daily, rotates keys every
+# JWT_KEY_ROTATION_DAYS; the file must be the same for every worker and host.
+# Other services verify tokens with the public keys at /.well-known/jwks.json.
+# Until the key ring exists, tokens are signed with HS256 and SECRET_KEY.
+JWT_KEYRING_PATH = os.getenv('JWT_KEYRING_PATH', str(BASE_DIR / 'jwt_keyring.json'))
+JWT_KEYRING_RELOAD_INTERVAL = 30
+JWT_KEY_ALGORITHM = os.getenv('JWT_KEY_ALGORITHM', 'RS256')  # or 'EdDSA'
+JWT_KEY_ROTATION_DAYS = int(os.getenv('JWT_KEY_ROTATION_DAYS', 30))
+JWT_JWKS_MAX_AGE = 3600
+# New keys are published this long before they sign anything, so services
+# holding a cached JWKS have picked them up by then.
+JWT_KEY_PUBLISH_AHEAD = timedelta(seconds=2 * JWT_JWKS_MAX_AGE)
+# Keep accepting HS256 tokens signed with SECRET_KEY (verification links and
+# tokens issued before the key ring). Turn off once REFRESH_TOKEN_LIFETIME
+# has passed since the first key started signing.
+JWT_ACCEPT_HS256 = os.getenv('JWT_ACCEPT_HS256', 'True') == 'True'
+
+# Revoked refresh token JTIs, shared by the workers on this host through an
+# SQLite file and checked in memory (see authentication.revocation).
+TOKEN_REVOCATION_STORE_PATH = BASE_DIR / 'revoked_tokens.sqlite3'
+TOKEN_REVOCATION_BLOOM_CAPACITY = 1_000_000
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+TOKEN_REVOCATION_LRU_SIZE = 100_000
+TOKEN_REVOCATION_SYNC_INTERVAL = 1.0
+# Bearer keys (comma-separated) API gateways send to POST /token/introspect/.
+TOKEN_INTROSPECTION_KEYS = [key for key in os.getenv('TOKEN_INTROSPECTION_KEYS', '').split(',') if key]
+TOKEN_INTROSPECTION_MAX_BATCH = 500
 AUTH_USER_MODEL = 'authentication.User'
 
+# Serve register/login/password-reset-complete with async views that hash
+# passwords in a process pool. Only useful when running under ASGI.
+ASYNC_PASSWORD_VIEWS = os.getenv('ASYNC_PASSWORD_VIEWS') == 'True'
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 0)) or os.cpu_count()
+# Hashing jobs allowed to wait for the pool before requests get a 503.
+PASSWORD_HASHING_MAX_PENDING = PASSWORD_HASHING_WORKERS * 4
+
+# Password hashing. Cost parameters come from `manage.py calibrate_hashers --write`,
+# which stores them in .env; unset values fall back to Django's defaults.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2_iterations': int(os.getenv('PBKDF2_ITERATIONS', 0)),
+    'scrypt_work_factor': int(os.getenv('SCRYPT_WORK_FACTOR', 0)),
+    'argon2_time_cost': int(os.getenv('ARGON2_TIME_COST', 0)),
+    'argon2_memory_cost': int(os.getenv('ARGON2_MEMORY_COST', 0)),
+}
+_CALIBRATED_HASHERS = {
+    'pbkdf2_sha256': 'authentication.hashers.CalibratedPBKDF2PasswordHasher',
+    'argon2': 'authentication.hashers.CalibratedArgon2PasswordHasher',
+    'scrypt': 'authentication.hashers.CalibratedScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_CALIBRATED_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _CALIBRATED_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -135,10 +278,63 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 REST_FRAMEWORK = {
+    # 'authentication.authentication.StatelessJWTAuthentication' can be used
+    # instead to build request.user from token claims without a User query.
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
+    ),
+    # orjson-backed JSON, falling back to the stdlib when it isn't installed.
+    # Views can opt out with renderer_classes/parser_classes.
+    'DEFAULT_RENDERER_CLASSES': (
+        'authentication.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'authentication.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
 }
+
+# Cache shared by every worker on the host, with a per-process LRU in front
+# of it (authentication.cache.TwoTierCache). Local copies live for
+# CACHE_LOCAL_TTL seconds, which bounds how long a worker can serve a value
+# another worker has just invalidated.
+CACHES = {
+    'default': {
+        'BACKEND': 'authentication.cache.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_PATH', str(BASE_DIR / 'cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+}
+CACHE_LOCAL_SIZE = 10_000
+CACHE_LOCAL_TTL = 5
+CACHE_VERSION_CHECK_INTERVAL = 1.0
+CACHE_LOCK_TIMEOUT = 10
+
+# Per-view request, latency and SQL metrics, served in Prometheus format at
+# /metrics/ when METRICS_ENABLED. Each worker writes its own file in
+# METRICS_DIR; clear the directory when deploying. Scrapers send METRICS_TOKEN
+# as a bearer token; without DEBUG, /metrics/ refuses everyone until it is set.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'metrics'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Sampling profiler for API views: requests carrying a signed PROFILING_HEADER
+# token (manage.py profiling token), plus a PROFILING_SAMPLE_RATE fraction of
+# all requests, have their stacks sampled every PROFILING_INTERVAL seconds
+# into PROFILING_DIR. Merge the dumps with manage.py profiling report.
+PROFILING_HEADER = 'X-HireHub-Profile'
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = 500
+
+# Seconds users loaded by CachedJWTAuthentication and provider listings stay cached.
+USER_CACHE_TTL = 30
+PROVIDER_CACHE_TTL = 60
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -176,12 +372,25 @@ SOCIALACCOUNT_PROVIDERS = {
 }
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'authentication.backends.EmailBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
 SOCIALACCOUNT_ADAPTER = 'social_auth.adapters.CustomSocialAccountAdapter'
 
+# Google ID tokens are verified locally against Google's signing keys, cached
+# for as long as Google's Cache-Control header allows (see social_auth.jwks).
+GOOGLE_JWKS_URL = os.getenv('GOOGLE_JWKS_URL', 'https://www.googleapis.com/oauth2/v3/certs')
+GOOGLE_USERINFO_URL = os.getenv('GOOGLE_USERINFO_URL', 'https://www.googleapis.com/oauth2/v2/userinfo')
+GOOGLE_ID_TOKEN_ISSUERS = ['https://accounts.google.com', 'accounts.google.com']
+# Empty means allauth's default Graph API URL.
+FACEBOOK_GRAPH_URL = os.getenv('FACEBOOK_GRAPH_URL', '')
+JWKS_DEFAULT_MAX_AGE = 3600
+# Shortest time between two key downloads, e.g. for tokens with unknown key ids.
+JWKS_MIN_REFRESH_INTERVAL = 60
+# Seconds a Google userinfo or Facebook profile response is reused for the same access token.
+SOCIAL_PROFILE_CACHE_TTL = int(os.getenv('SOCIAL_PROFILE_CACHE_TTL', 60))
+
 ACCOUNT_USER_MODEL_USERNAME_FIELD = None
 # ACCOUNT_AUTHENTICATION_METHOD = 'email'
 
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.http import StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
-from .models import User, CustomerProfile, ProviderProfile
+from .models import User, CustomerProfile, ProviderProfile, OutgoingEmail
+from .export import FORMATS, export_rows
 
 class CustomerProfileInline(admin.StackedInline):
     model = CustomerProfile
@@ -16,12 +18,19 @@ class ProviderProfileInline(admin.StackedInline):
     fk_name = 'user'
     
 
+def stream_export(queryset, fmt):
+    lines, content_type = FORMATS[fmt]
+    response = StreamingHttpResponse(lines(export_rows(queryset)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="users.{fmt}"'
+    return response
+
 class UserAdmin(BaseUserAdmin):
     model = User
     list_display = ('email', 'user_type', 'is_staff', 'is_active')
     list_filter = ('user_type', 'is_staff', 'is_superuser', 'is_active')
     ordering = ('email',)
     search_fields = ('email',)
+    actions = ['export_csv', 'export_jsonl']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('user_type',)}),
@@ -46,6 +55,37 @@ class UserAdmin(BaseUserAdmin):
             return [ProviderProfileInline]
         return []
 
+    @admin.action(description=_('Export selected users as CSV'))
+    def export_csv(self, request, queryset):
+        return stream_export(queryset, 'csv')
+
+    @admin.action(description=_('Export selected users as JSON lines'))
+    def export_jsonl(self, request, queryset):
+        return stream_export(queryset, 'jsonl')
+
+class CustomerProfileAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'phone', 'location', 'is_profile_complete')
+    list_filter = ('is_profile_complete',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__email',)
+
+class ProviderProfileAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'service_area', 'hourly_rate', 'location', 'is_profile_complete')
+    list_filter = ('is_profile_complete',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('user__email',)
+
 admin.site.register(User, UserAdmin)
-admin.site.register(CustomerProfile)
-admin.site.register(ProviderProfile)
+admin.site.register(CustomerProfile, CustomerProfileAdmin)
+admin.site.register(ProviderProfile, ProviderProfileAdmin)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email',)
+    ordering = ('-created_at',)
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
@@ -0,0 +1,115 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+
+from .hashing import HashingPoolBusy, make_password_async, verify_password_async
+from .serializers import RegisterSerializer, SetNewPasswordSerializer
+from .views import login_payload, register_user
+
+User = get_user_model()
+
+
+def parse_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def bad_request():
+    return JsonResponse({'detail': 'Request body must be a JSON object.'}, status=400)
+
+
+def pool_busy():
+    response = JsonResponse({'detail': 'Server is busy, please retry shortly.'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+async def validate(serializer):
+    """Run serializer validation off the event loop, returning an error response or None."""
+    try:
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+    except APIException as exc:
+        return JsonResponse(exc.detail, status=exc.status_code, safe=False)
+    return None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRegisterView(View):
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_request()
+        serializer = RegisterSerializer(data=data)
+        error = await validate(serializer)
+        if error:
+            return error
+        try:
+            encoded_password = await make_password_async(serializer.validated_data['password'])
+        except HashingPoolBusy:
+            return pool_busy()
+
+        payload = await sync_to_async(register_user)(request, serializer, encoded_password=encoded_password)
+        return JsonResponse(payload, status=201)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_request()
+        email = data.get('email')
+        password = data.get('password')
+        if not email or not password:
+            return JsonResponse({'detail': 'Invalid credentials'}, status=401)
+
+        try:
+            user = await User.objects.select_related(
+                'customerprofile', 'providerprofile').aget_by_email(email)
+        except User.DoesNotExist:
+            user = None
+        try:
+            if user is None:
+                # Hash anyway so a missing account takes as long as a wrong password.
+                await make_password_async(password)
+                return JsonResponse({'detail': 'Invalid credentials'}, status=401)
+            is_correct, must_update = await verify_password_async(password, user.password)
+            if is_correct and must_update:
+                user.password = await make_password_async(password)
+                await user.asave(update_fields=['password'])
+        except HashingPoolBusy:
+            return pool_busy()
+
+        if not is_correct or not user.is_active:
+            return JsonResponse({'detail': 'Invalid credentials'}, status=401)
+
+        payload, status_code = await sync_to_async(login_payload)(user)
+        return JsonResponse(payload, status=status_code)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncSetNewPasswordView(View):
+    async def patch(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_request()
+        serializer = SetNewPasswordSerializer(data=data)
+        error = await validate(serializer)
+        if error:
+            return error
+        try:
+            encoded_password = await make_password_async(serializer.validated_data['password'])
+        except HashingPoolBusy:
+            return pool_busy()
+
+        await sync_to_async(serializer.save)(encoded_password=encoded_password)
+        return JsonResponse({'success': True, 'message': 'Password reset successful'}, status=200)
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import USER_NAMESPACE, cache
+
+
+class ClaimsUser(TokenUser):
+    """A lightweight request user built only from the access token claims."""
+
+    @property
+    def user_type(self):
+        return self.token.get('user_type')
+
+    @property
+    def is_verified(self):
+        return self.token.get('is_verified', False)
+
+    @property
+    def profile_complete(self):
+        return self.token.get('profile_complete', False)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Opt-in replacement for ``JWTAuthentication`` that skips the ``User``
+    lookup. Account changes (deactivation, verification) only take effect
+    once the client holds a newly minted token.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        return ClaimsUser(validated_token)
+
+
+class CachedUser:
+    """
+    The request user served by ``CachedJWTAuthentication``: only the fields
+    authentication and permission checks read, so the shared on-disk cache
+    never holds a password hash.
+    """
+
+    fields = ('id', 'email', 'user_type', 'is_active', 'is_verified', 'is_staff', 'is_superuser')
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, values):
+        for field in self.fields:
+            setattr(self, field, values[field])
+
+    @classmethod
+    def values_of(cls, user):
+        return {field: getattr(user, field) for field in cls.fields}
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.email
+
+    def __eq__(self, other):
+        return isinstance(other, (CachedUser, get_user_model())) and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` with the ``User`` lookup served from the two-tier
+    cache, as a ``CachedUser``. Saves and deletes evict users through
+    signals; other workers may keep their local copy for up to
+    CACHE_LOCAL_TTL seconds.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        # Only users that pass the inactive/revoked checks get cached.
+        values = cache.get_or_set(USER_NAMESPACE, str(user_id), lambda: CachedUser.values_of(
+            super(CachedJWTAuthentication, self).get_user(validated_token)), timeout=settings.USER_CACHE_TTL)
+        # A fresh object per request, so one view can't mutate another's user.
+        return CachedUser(values)
@@ -0,0 +1,41 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from .utils import QueryCounter
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Email/password backend that loads the user together with its profile in
+    one query.
+
+    A failed email/password login raises ``PermissionDenied``, which makes
+    ``authenticate()`` stop instead of repeating the lookup in the allauth
+    backend listed after this one.
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        email = email or username or kwargs.get(User.USERNAME_FIELD)
+        if email is None or password is None:
+            return None
+
+        with QueryCounter() as counter:
+            try:
+                user = User._default_manager.select_related(
+                    'customerprofile', 'providerprofile').get_by_email(email)
+            except User.DoesNotExist:
+                # Run the hasher anyway so a missing account takes as long as a wrong password.
+                User().set_password(password)
+                user = None
+        logger.debug("Email login lookup ran %d queries", counter.count)
+
+        if user is not None and user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        raise PermissionDenied
@@ -0,0 +1,160 @@
+import asyncio
+import email
+import email.policy
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from .routers import REPLICA_DB_ALIAS
+
+
+@contextmanager
+def temporary_database(verbosity=0):
+    """
+    Run benchmarks against a throwaway test database instead of the real one,
+    in Django's test environment so the test client's 'testserver' host is
+    allowed and mail goes to the in-memory outbox. The cache and the token
+    revocation store are throwaway files too.
+    """
+    with tempfile.TemporaryDirectory() as tmp, \
+            override_settings(CACHES={'default': {**settings.CACHES['default'],
+                                                  'LOCATION': os.path.join(tmp, 'cache.sqlite3')}},
+                              TOKEN_REVOCATION_STORE_PATH=os.path.join(tmp, 'revoked_tokens.sqlite3')), \
+            _test_database(verbosity):
+        yield
+
+
+@contextmanager
+def _test_database(verbosity):
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    try:
+        connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    except BaseException:
+        teardown_test_environment()
+        raise
+    replica = connections[REPLICA_DB_ALIAS] if REPLICA_DB_ALIAS in connections else None
+    if replica is not None:
+        # Replica reads go to the throwaway database too, as in Django's test runner.
+        replica_settings = replica.settings_dict
+        replica.close()
+        replica.creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            replica.close()
+            replica.settings_dict = replica_settings
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    """Summarize per-request latencies (seconds) over a run that took ``elapsed`` seconds."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'rps': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+    }
+
+
+def format_summary(name, summary):
+    return (f"{name:<28} {summary['requests']:>6} req  {summary['rps']:>9.1f} req/s  "
+            f"p50 {summary['p50_ms']:>8.2f} ms  p95 {summary['p95_ms']:>8.2f} ms  "
+            f"p99 {summary['p99_ms']:>8.2f} ms")
+
+
+class Stopwatch:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+
+
+class SMTPSink:
+    """
+    Local SMTP server that accepts every message and keeps it in memory,
+    standing in for the mail provider during load tests. Use as a context
+    manager; it listens on a free port unless one is given.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.messages = []
+
+    def __enter__(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(ready),), name='smtp-sink', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+
+    def connection(self):
+        """An SMTP email backend connection that delivers to this sink."""
+        return get_connection('django.core.mail.backends.smtp.EmailBackend', host=self.host, port=self.port,
+                              username='', password='', use_tls=False, use_ssl=False, timeout=10)
+
+    def find(self, to_email, subject):
+        return next((message for message in reversed(self.messages)
+                     if message['To'] == to_email and message['Subject'] == subject), None)
+
+    async def _serve(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self._session, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        ready.set()
+        async with server:
+            await self._stopped.wait()
+
+    async def _session(self, reader, writer):
+        writer.write(b'220 localhost ESMTP\r\n')
+        while True:
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command == b'EHLO':
+                writer.write(b'250-localhost\r\n250 8BITMIME\r\n')
+            elif command == b'DATA':
+                writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                await writer.drain()
+                lines = []
+                while (line := await reader.readline()) not in (b'.\r\n', b''):
+                    lines.append(line[1:] if line.startswith(b'..') else line)
+                self.messages.append(email.message_from_bytes(b''.join(lines), policy=email.policy.default))
+                writer.write(b'250 OK\r\n')
+            elif command == b'QUIT':
+                writer.write(b'221 Bye\r\n')
+                break
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                writer.write(b'250 OK\r\n')
+            else:
+                writer.write(b'502 Command not implemented\r\n')
+        await writer.drain()
+        writer.close()
@@ -0,0 +1,300 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .utils import TTLLRUCache
+
+_MISSING = object()
+
+USER_NAMESPACE = 'user'
+PROVIDER_NAMESPACE = 'providers'
+SOCIAL_NAMESPACE = 'social'
+
+
+def hashed_key(*parts):
+    """A short cache key for arbitrary (e.g. URL or query parameter) input."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Django cache backend storing entries in an SQLite file in WAL mode, so
+    every worker process on the host reads and writes the same cache without
+    running a cache server. Integers are stored as SQL integers so ``incr``
+    is atomic across processes; everything else is pickled.
+    """
+
+    cull_every = 1000
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+        self._sets = 0
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires REAL) WITHOUT ROWID")
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _dump(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time())).fetchone()
+        return default if row is None else self._load(row[0])
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, self._dump(value), self.get_backend_timeout(timeout)))
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection().execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._dump(value), self.get_backend_timeout(timeout), time.time()))
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.connection().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.connection().execute(
+            "UPDATE cache SET value = value + ? "
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) RETURNING value",
+            (delta, key, time.time())).fetchone()
+        if row is None:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.connection().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.connection().execute("DELETE FROM cache")
+
+    def _maybe_cull(self):
+        self._sets += 1
+        if self._sets % self.cull_every:
+            return
+        conn = self.connection()
+        conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        count = conn.execute("SELECT count(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            # Drop the entries closest to expiring, like the database cache backend.
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency if self._cull_frequency else count,))
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests.
+        pass
+
+
+class TwoTierCache:
+    """
+    A per-process LRU in front of a shared Django cache.
+
+    Keys live in namespaces. ``invalidate(namespace)`` bumps the namespace's
+    version in the shared tier, orphaning every key in it at once; processes
+    re-read namespace versions at most every ``version_check_interval``
+    seconds. Local copies live for ``local_ttl`` seconds, which bounds how
+    long another worker can serve a value after it was deleted or
+    invalidated elsewhere.
+
+    ``get_or_set`` lets only one caller per key compute a missing value:
+    threads in a process wait on a lock, other processes wait for the
+    holder of a short-lived lock key in the shared tier, and compute it
+    themselves if the holder drops the lock without storing a value.
+    """
+
+    lock_stripes = 64
+
+    def __init__(self, alias='default', local_size=10_000, local_ttl=5, version_check_interval=1.0,
+                 lock_timeout=10):
+        self.alias = alias
+        self.local = TTLLRUCache(local_size, ttl=local_ttl)
+        self.local_ttl = local_ttl
+        self.version_check_interval = version_check_interval
+        self.lock_timeout = lock_timeout
+        self._versions = {}
+        self._locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        self._stats = defaultdict(lambda: {'local_hits': 0, 'shared_hits': 0, 'misses': 0})
+        self._stats_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _version(self, namespace):
+        version, checked_at = self._versions.get(namespace, (None, 0.0))
+        now = time.monotonic()
+        if version is None or now - checked_at >= self.version_check_interval:
+            version_key = f'ns:{namespace}'
+            version = self.shared.get(version_key)
+            if version is None:
+                self.shared.add(version_key, 1, timeout=None)
+                version = self.shared.get(version_key, 1)
+            self._versions[namespace] = (version, now)
+        return version
+
+    def make_key(self, namespace, key):
+        return f'{namespace}:{self._version(namespace)}:{key}'
+
+    def _count(self, namespace, outcome):
+        with self._stats_lock:
+            self._stats[namespace][outcome] += 1
+
+    def _lookup(self, namespace, full_key):
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count(namespace, 'local_hits')
+            return value
+        value = self.shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count(namespace, 'shared_hits')
+            self.local.set(full_key, value)
+            return value
+        self._count(namespace, 'misses')
+        return _MISSING
+
+    def get(self, namespace, key, default=None):
+        value = self._lookup(namespace, self.make_key(namespace, key))
+        return default if value is _MISSING else value
+
+    def set(self, namespace, key, value, timeout=DEFAULT_TIMEOUT):
+        full_key = self.make_key(namespace, key)
+        self.shared.set(full_key, value, timeout)
+        local_ttl = self.local_ttl if timeout in (DEFAULT_TIMEOUT, None) else min(self.local_ttl, timeout)
+        self.local.set(full_key, value, ttl=local_ttl)
+
+    def delete(self, namespace, key):
+        full_key = self.make_key(namespace, key)
+        self.local.delete(full_key)
+        self.shared.delete(full_key)
+
+    def invalidate(self, namespace):
+        """Drop every key in ``namespace``, in every process."""
+        version_key = f'ns:{namespace}'
+        try:
+            version = self.shared.incr(version_key)
+        except ValueError:
+            self.shared.add(version_key, 2, timeout=None)
+            version = self.shared.get(version_key, 2)
+        self._versions[namespace] = (version, time.monotonic())
+
+    def forget(self):
+        """Drop this process's copies and namespace versions, e.g. once the shared tier is another cache."""
+        self.local.clear()
+        self._versions.clear()
+
+    def clear(self):
+        """Empty both tiers."""
+        self.forget()
+        self.shared.clear()
+
+    def get_or_set(self, namespace, key, compute, timeout=DEFAULT_TIMEOUT):
+        full_key = self.make_key(namespace, key)
+        value = self._lookup(namespace, full_key)
+        if value is not _MISSING:
+            return value
+        with self._locks[zlib.crc32(full_key.encode()) % self.lock_stripes]:
+            # Another thread may have filled it while we waited.
+            value = self.local.get(full_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            lock_key = f'lock:{full_key}'
+            if self.shared.add(lock_key, 1, timeout=self.lock_timeout):
+                try:
+                    value = compute()
+                    self.set(namespace, key, value, timeout)
+                finally:
+                    self.shared.delete(lock_key)
+                return value
+            # Another process is computing it; wait for its result. If its lock
+            # goes without a result, its compute raised: compute here instead.
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.01)
+                # The holder stores the value before it drops the lock, so check in this order.
+                locked = self.shared.has_key(lock_key)
+                value = self.shared.get(full_key, _MISSING)
+                if value is not _MISSING:
+                    self.local.set(full_key, value)
+                    return value
+                if not locked:
+                    break
+            value = compute()
+            self.set(namespace, key, value, timeout)
+            return value
+
+    def stats(self):
+        with self._stats_lock:
+            snapshot = {namespace: dict(counts) for namespace, counts in self._stats.items()}
+        for counts in snapshot.values():
+            total = counts['local_hits'] + counts['shared_hits'] + counts['misses']
+            counts['hit_rate'] = (counts['local_hits'] + counts['shared_hits']) / total if total else 0.0
+        return snapshot
+
+
+cache = TwoTierCache(
+    local_size=settings.CACHE_LOCAL_SIZE,
+    local_ttl=settings.CACHE_LOCAL_TTL,
+    version_check_interval=settings.CACHE_VERSION_CHECK_INTERVAL,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+)
+
+
+@receiver(setting_changed)
+def forget_cached_values(setting, **kwargs):
+    if setting == 'CACHES':
+        cache.forget()
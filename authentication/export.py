@@ -0,0 +1,56 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+USER_FIELDS = ('id', 'email', 'user_type', 'is_verified', 'is_active', 'is_staff', 'last_login')
+PROFILE_FIELDS = {
+    'customerprofile': ('phone', 'location', 'is_profile_complete'),
+    'providerprofile': ('skills', 'service_area', 'hourly_rate', 'location', 'latitude', 'longitude',
+                        'is_profile_complete'),
+}
+# Both profiles have location and is_profile_complete, so the export has one column for each.
+COLUMNS = USER_FIELDS + ('phone', 'skills', 'service_area', 'hourly_rate', 'location',
+                         'latitude', 'longitude', 'is_profile_complete')
+
+
+class Echo:
+    """File-like object whose write() returns what it is given, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Yield one flat dict per user with its profile columns filled in. Users and
+    both profiles come from a single LEFT JOIN read in chunks, so memory stays
+    flat however many rows there are.
+    """
+    lookups = list(USER_FIELDS)
+    for relation, fields in PROFILE_FIELDS.items():
+        lookups += [f'{relation}__{field}' for field in fields]
+    for values in queryset.values(*lookups).iterator(chunk_size=chunk_size):
+        relation = {'customer': 'customerprofile', 'provider': 'providerprofile'}.get(values['user_type'])
+        row = {column: values.get(column) for column in USER_FIELDS}
+        for field in PROFILE_FIELDS.get(relation, ()):
+            row[field] = values[f'{relation}__{field}']
+        yield {column: row.get(column) for column in COLUMNS}
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row.values()])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+}
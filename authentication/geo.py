@@ -0,0 +1,142 @@
+import csv
+import math
+from functools import lru_cache
+
+from django.conf import settings
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+
+# Approximate (height, width at the equator) of a geohash cell in km, by precision.
+CELL_SIZE_KM = {
+    1: (4992.6, 5009.4),
+    2: (624.1, 1252.3),
+    3: (156.0, 156.5),
+    4: (19.5, 39.1),
+    5: (4.9, 4.9),
+    6: (0.61, 1.22),
+    7: (0.153, 0.153),
+    8: (0.019, 0.038),
+    9: (0.0048, 0.0048),
+}
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def decode_bounds(geohash):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range, lng_range
+
+
+def neighbors(geohash):
+    """The cell itself plus the eight cells around it."""
+    lat_range, lng_range = decode_bounds(geohash)
+    lat_step = lat_range[1] - lat_range[0]
+    lng_step = lng_range[1] - lng_range[0]
+    lat_center = (lat_range[0] + lat_range[1]) / 2
+    lng_center = (lng_range[0] + lng_range[1]) / 2
+    cells = set()
+    for dlat in (-1, 0, 1):
+        lat = lat_center + dlat * lat_step
+        if not -90 <= lat <= 90:
+            continue
+        for dlng in (-1, 0, 1):
+            lng = (lng_center + dlng * lng_step + 180) % 360 - 180
+            cells.add(encode(lat, lng, len(geohash)))
+    return cells
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def covered_radius_km(precision, latitude):
+    """Distance from any point in a cell that its 3x3 block is guaranteed to cover."""
+    height, width = CELL_SIZE_KM[precision]
+    return min(height, width * max(math.cos(math.radians(latitude)), 0.01))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return ((min_lat, max_lat), (min_lng, max_lng) or None) around a point."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lat_bounds = (max(latitude - dlat, -90.0), min(latitude + dlat, 90.0))
+    cos_lat = math.cos(math.radians(max(abs(lat_bounds[0]), abs(lat_bounds[1]))))
+    if cos_lat < 0.01:
+        return lat_bounds, None
+    dlng = dlat / cos_lat
+    if longitude - dlng < -180 or longitude + dlng > 180:
+        return lat_bounds, None
+    return lat_bounds, (longitude - dlng, longitude + dlng)
+
+
+def precision_for_radius(radius_km, latitude):
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if covered_radius_km(precision, latitude) >= radius_km:
+            return precision
+    return 1
+
+
+def normalize_place(name):
+    return ' '.join(name.lower().split())
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path):
+    """
+    Read an offline gazetteer: a CSV file with ``name``, ``latitude`` and
+    ``longitude`` columns. Returns a dict of normalized place name to coordinates.
+    """
+    places = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                places[normalize_place(row['name'])] = (float(row['latitude']), float(row['longitude']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return places
+
+
+def geocode(location, gazetteer_path=None):
+    gazetteer_path = gazetteer_path or getattr(settings, 'GEO_GAZETTEER_PATH', None)
+    if not location or not gazetteer_path:
+        return None
+    return load_gazetteer(str(gazetteer_path)).get(normalize_place(location))
@@ -0,0 +1,62 @@
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def calibrated(name, default):
+    """
+    Read a cost parameter written by ``manage.py calibrate_hashers``, never
+    going below Django's default so a rehash on login can't weaken a hash.
+    """
+    return max(getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(name) or default, default)
+
+
+# Same algorithm names as Django's hashers, so existing hashes keep verifying
+# and get upgraded in place by check_password() once the cost changes.
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return calibrated('pbkdf2_iterations', PBKDF2PasswordHasher.iterations)
+
+
+def scrypt_maxmem(n, r):
+    # scrypt needs about 128 * n * r bytes; leave headroom above OpenSSL's 32 MiB default.
+    return max(32 * 1024 * 1024, 256 * n * r)
+
+
+class CalibratedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return calibrated('scrypt_work_factor', ScryptPasswordHasher.work_factor)
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Size the memory limit from the parameters being hashed with, so a
+        # stored hash with a higher work factor than the current setting can
+        # still be verified (and then downgraded) on login.
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            maxmem=scrypt_maxmem(n, r), dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+class CalibratedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return calibrated('argon2_time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return calibrated('argon2_memory_cost', Argon2PasswordHasher.memory_cost)
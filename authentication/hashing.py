@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing pool already has its maximum of queued jobs."""
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def pool_size():
+    return getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+
+
+def get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = pool_size()
+                max_pending = getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', None) or workers * 4
+                _slots = threading.BoundedSemaphore(max_pending)
+                # Spawned workers import Django fresh instead of inheriting
+                # the server's threads and open connections through fork().
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'HireHub.settings'),),
+                )
+    return _executor
+
+
+def warm_pool():
+    """Start every worker process up front so the first requests don't pay for it."""
+    executor = get_executor()
+    for future in [executor.submit(os.getpid) for _ in range(pool_size())]:
+        future.result()
+
+
+def shutdown_pool():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+async def run_in_pool(func, *args):
+    executor = get_executor()
+    if not _slots.acquire(blocking=False):
+        raise HashingPoolBusy()
+    try:
+        return await asyncio.wrap_future(executor.submit(func, *args))
+    finally:
+        _slots.release()
+
+
+def make_passwords(passwords):
+    """Hash a batch of passwords across the worker pool, keeping their order."""
+    passwords = list(passwords)
+    chunksize = max(1, len(passwords) // (pool_size() * 4))
+    return list(get_executor().map(make_password, passwords, chunksize=chunksize))
+
+
+async def make_password_async(password):
+    return await run_in_pool(make_password, password)
+
+
+async def verify_password_async(password, encoded):
+    """Return ``(is_correct, must_update)`` for ``password`` against ``encoded``."""
+    return await run_in_pool(verify_password, password, encoded)
@@ -0,0 +1,228 @@
+import datetime
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
+from rest_framework_simplejwt.settings import api_settings
+
+ALGORITHMS = ('RS256', 'EdDSA')
+
+
+def generate_key(algorithm, not_before):
+    """A new key ring entry that starts signing tokens at ``not_before``."""
+    if algorithm == 'RS256':
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    elif algorithm == 'EdDSA':
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"Unsupported algorithm {algorithm!r}; use one of {', '.join(ALGORITHMS)}")
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return {
+        'kid': f'{not_before:%Y%m%d}-{secrets.token_hex(4)}',
+        'alg': algorithm,
+        'not_before': not_before.isoformat(),
+        'private_key': pem.decode(),
+    }
+
+
+def read_keyring(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['keys']
+    except FileNotFoundError:
+        return []
+
+
+def write_keyring(path, entries):
+    """Replace the key ring file atomically, readable by its owner only."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'keys': entries}, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SigningKey:
+    def __init__(self, entry):
+        self.kid = entry['kid']
+        self.algorithm = entry['alg']
+        self.not_before = datetime.datetime.fromisoformat(entry['not_before'])
+        self.private_key = serialization.load_pem_private_key(entry['private_key'].encode(), password=None)
+        self.public_key = self.private_key.public_key()
+
+    def jwk(self):
+        algorithm = jwt.get_algorithm_by_name(self.algorithm)
+        return {**algorithm.to_jwk(self.public_key, as_dict=True), 'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'}
+
+
+class KeyRing:
+    """
+    Token signing keys, read from the JSON file ``rotate_jwt_keys`` maintains.
+
+    Tokens are signed with the newest key whose ``not_before`` has passed;
+    every key in the file verifies tokens and is published in the JWKS, so
+    a new key is visible to other services before it signs anything and an
+    old one keeps verifying until the tokens it signed have expired. Each
+    worker checks the file for changes at most every ``reload_interval``
+    seconds.
+    """
+
+    def __init__(self, path, reload_interval):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.keys = {}
+        self._ordered = []
+        self._jwks = None
+        self._mtime = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def sync(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.reload_interval:
+                return
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                self._load(read_keyring(self.path))
+                self._mtime = mtime
+            self._checked = now
+
+    def _load(self, entries):
+        keys = [SigningKey(entry) for entry in entries]
+        self._ordered = sorted(keys, key=lambda key: key.not_before)
+        self.keys = {key.kid: key for key in keys}
+        body = json.dumps({'keys': [key.jwk() for key in self._ordered]}).encode()
+        self._jwks = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+
+    def signing_key(self):
+        self.sync()
+        now = timezone.now()
+        current = None
+        for key in self._ordered:
+            if key.not_before > now:
+                break
+            current = key
+        return current
+
+    def get(self, kid):
+        self.sync()
+        return self.keys.get(kid)
+
+    def jwks(self):
+        """The public keys as a rendered JWKS document and its ETag."""
+        self.sync()
+        return self._jwks or (b'{"keys":[]}', '"empty"')
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    simplejwt backend signing with the key ring and putting the key id in
+    the token header. Tokens without a ``kid`` are checked as HS256 with
+    SIGNING_KEY, the way they were issued before the key ring existed; that
+    is also how tokens are signed while the key ring is empty.
+    """
+
+    def __init__(self, keyring, accept_hs256, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keyring = keyring
+        self.accept_hs256 = accept_hs256
+
+    def encode(self, payload):
+        key = self.keyring.signing_key()
+        if key is None:
+            return super().encode(payload)
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+        return jwt.encode(jwt_payload, key.private_key, algorithm=key.algorithm,
+                          headers={'kid': key.kid}, json_encoder=self.json_encoder)
+
+    def decode(self, token, verify=True):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+        if kid is None:
+            if not self.accept_hs256 and self.keyring.signing_key() is not None:
+                raise TokenBackendError(_("Token is invalid"))
+            return super().decode(token, verify)
+
+        key = self.keyring.get(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+        try:
+            return jwt.decode(
+                token,
+                key.public_key,
+                # The key decides the algorithm, never the token header.
+                algorithms=[key.algorithm],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.get_leeway(),
+                options={'verify_aud': self.audience is not None, 'verify_signature': verify},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise TokenBackendExpiredToken(_("Token is expired")) from e
+        except jwt.InvalidTokenError as e:
+            raise TokenBackendError(_("Token is invalid")) from e
+
+
+_keyring = None
+_token_backend = None
+_init_lock = threading.Lock()
+
+
+def get_keyring():
+    global _keyring
+    if _keyring is None:
+        with _init_lock:
+            if _keyring is None:
+                _keyring = KeyRing(settings.JWT_KEYRING_PATH, settings.JWT_KEYRING_RELOAD_INTERVAL)
+    return _keyring
+
+
+def get_token_backend():
+    global _token_backend
+    if _token_backend is None:
+        keyring = get_keyring()
+        with _init_lock:
+            if _token_backend is None:
+                _token_backend = KeyRingTokenBackend(
+                    keyring,
+                    settings.JWT_ACCEPT_HS256,
+                    api_settings.ALGORITHM,
+                    api_settings.SIGNING_KEY,
+                    api_settings.VERIFYING_KEY,
+                    api_settings.AUDIENCE,
+                    api_settings.ISSUER,
+                    None,
+                    api_settings.LEEWAY,
+                    api_settings.JSON_ENCODER,
+                )
+    return _token_backend
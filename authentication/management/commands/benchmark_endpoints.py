@@ -0,0 +1,278 @@
+import gc
+import json
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from authentication.benchmarks import SMTPSink, Stopwatch, format_summary, summarize, temporary_database
+from authentication.outbox import drain
+from authentication.utils import QueryCounter
+
+PASSWORD = 'bench-password-123'
+NEW_PASSWORD = 'bench-password-456'
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmark_baseline.json'
+METRIC_LINE = re.compile(r'^hirehub_(requests|sql_queries)_total\{view="([^"]*)",[^}]*\} (\S+)$', re.M)
+LINK = re.compile(r'https?://\S+')
+
+
+class InProcessTarget:
+    """Requests through the Django test client, counting each one's SQL statements."""
+
+    mode = 'inprocess'
+
+    def __init__(self):
+        self._counts = []
+        self._lock = threading.Lock()
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        client = Client()
+        with QueryCounter() as counter:
+            if method == 'GET':
+                response = client.get(path, headers=headers)
+            else:
+                response = client.generic(method, path, json.dumps(data), 'application/json', headers=headers)
+        with self._lock:
+            self._counts.append(counter.count)
+        is_json = response.get('Content-Type', '').startswith('application/json')
+        return response.status_code, response.json() if is_json else {}
+
+    def begin_phase(self, view_name):
+        self._counts = []
+
+    def end_phase(self, view_name):
+        """Queries per request, as the median so one cold cache doesn't skew it."""
+        return statistics.median(self._counts)
+
+
+class LiveTarget:
+    """
+    Requests to a running server over HTTP. Per-request query counts come
+    from the server's /metrics/ counters, so nothing else should be sending
+    it traffic during the run.
+    """
+
+    mode = 'live'
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self._requests = requests
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def request(self, method, path, data=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.session.request(method, self.base_url + path, json=data, headers=headers,
+                                        allow_redirects=False, timeout=30)
+        is_json = response.headers.get('Content-Type', '').startswith('application/json')
+        return response.status_code, response.json() if is_json else {}
+
+    def scrape(self):
+        headers = {'Authorization': f'Bearer {settings.METRICS_TOKEN}'} if settings.METRICS_TOKEN else {}
+        response = self.session.get(self.base_url + reverse('metrics'), headers=headers, timeout=30)
+        totals = {}
+        if response.status_code == 200:
+            for metric, view, value in METRIC_LINE.findall(response.text):
+                totals[metric, view] = totals.get((metric, view), 0.0) + float(value)
+        return totals
+
+    def begin_phase(self, view_name):
+        self._before = self.scrape()
+
+    def end_phase(self, view_name):
+        after = self.scrape()
+        requests = after.get(('requests', view_name), 0) - self._before.get(('requests', view_name), 0)
+        queries = after.get(('sql_queries', view_name), 0) - self._before.get(('sql_queries', view_name), 0)
+        return queries / requests if requests else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the register, email-verify, profile, login, logout and password-reset endpoints, "
+        "one phase per endpoint, and fail if SQL queries per request regress past the stored baseline, "
+        "or p95 latency too when the baseline was saved with --latency on this machine. Runs in-process against a throwaway database, or with --live-url against a "
+        "running server that shares this settings module's database; queued emails are then delivered "
+        "to a local SMTP stand-in by this command, so don't run send_queued_emails alongside it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Accounts taken through the whole flow.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Parallel clients; needs --live-url.")
+        parser.add_argument('--live-url', help="Base URL of a running server, e.g. http://127.0.0.1:8000.")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Store this run's results as the baseline for its mode instead of comparing.")
+        parser.add_argument('--latency', action='store_true',
+                            help="With --save-baseline, store p95 latencies as well. They only mean something "
+                                 "on the machine that measured them, so keep such a baseline out of the repo.")
+        parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                            help="Allowed p95 increase over the baseline, as a fraction.")
+        parser.add_argument('--latency-slack-ms', type=float, default=2.0,
+                            help="Allowed p95 increase on top of the tolerance, so millisecond endpoints aren't flaky.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and not options['live_url']:
+            raise CommandError("--concurrency needs --live-url; the in-memory test database locks out concurrent writers.")
+        if options['live_url']:
+            target = LiveTarget(options['live_url'])
+            results = self.run(target, options)
+        else:
+            target = InProcessTarget()
+            with temporary_database():
+                results = self.run(target, options)
+
+        mode = target.mode
+        for name, summary in results.items():
+            queries = '-' if summary['queries'] is None else f"{summary['queries']:g}"
+            self.stdout.write(f"{format_summary(name, summary)}  queries {queries:>5}")
+
+        path = Path(options['baseline'])
+        baselines = json.loads(path.read_text()) if path.exists() else {}
+        if options['save_baseline']:
+            keys = ('queries', 'p95_ms') if options['latency'] else ('queries',)
+            baselines[mode] = {
+                name: {key: round(summary[key], 2) if isinstance(summary[key], float) else summary[key]
+                       for key in keys}
+                for name, summary in results.items()
+            }
+            path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Saved {mode} baseline to {path}."))
+            return
+        if mode not in baselines:
+            self.stdout.write(self.style.WARNING(f"No {mode} baseline in {path}; run with --save-baseline."))
+            return
+        failures = self.compare(results, baselines[mode], options['latency_tolerance'], options['latency_slack_ms'])
+        if failures:
+            raise CommandError("Regressions against %s:\n  %s" % (path, '\n  '.join(failures)))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against the {mode} baseline."))
+
+    @staticmethod
+    def compare(results, baseline, latency_tolerance, latency_slack_ms):
+        failures = []
+        for name, summary in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if summary['queries'] is not None and expected['queries'] is not None \
+                    and summary['queries'] > expected['queries']:
+                failures.append(f"{name}: {summary['queries']:g} queries per request, baseline {expected['queries']:g}")
+            if 'p95_ms' not in expected:
+                continue
+            limit = expected['p95_ms'] * (1 + latency_tolerance) + latency_slack_ms
+            if summary['p95_ms'] > limit:
+                failures.append(f"{name}: p95 {summary['p95_ms']:.1f} ms, limit {limit:.1f} ms "
+                                f"(baseline {expected['p95_ms']:.1f} ms)")
+        return failures
+
+    def run(self, target, options):
+        run_id = time.strftime('%Y%m%d%H%M%S')
+        with SMTPSink() as sink:
+            # One untimed pass first, so connections, caches and imports are warm.
+            self.journey(target, sink, [self.new_user(f'{run_id}-warmup')], 1, results=None)
+            # Move the long-lived startup objects out of the collector's way, as
+            # gc.freeze() in a pre-forking server does; otherwise an occasional full
+            # collection over them lands in one request and dominates p95.
+            gc.collect()
+            gc.freeze()
+            users = [self.new_user(f'{run_id}-{i}') for i in range(options['users'])]
+            results = {}
+            try:
+                self.journey(target, sink, users, options['concurrency'], results)
+            finally:
+                gc.unfreeze()
+        return results
+
+    @staticmethod
+    def new_user(suffix):
+        return {'email': f'bench-{suffix}@example.com'}
+
+    def journey(self, target, sink, users, concurrency, results):
+        def phase(view_name, call):
+            target.begin_phase(view_name)
+
+            def timed(user):
+                start = time.perf_counter()
+                call(user)
+                return time.perf_counter() - start
+
+            with Stopwatch() as watch:
+                if concurrency > 1:
+                    with ThreadPoolExecutor(concurrency) as executor:
+                        latencies = list(executor.map(timed, users))
+                else:
+                    latencies = [timed(user) for user in users]
+            queries = target.end_phase(view_name)
+            if results is not None:
+                results[view_name] = dict(summarize(latencies, watch.elapsed), queries=queries)
+
+        def call(user, method, view_name, expected, data=None, token=None, path=None):
+            status_code, body = target.request(method, path or reverse(view_name), data, token)
+            if status_code != expected:
+                raise CommandError(f"{method} {view_name} for {user['email']}: HTTP {status_code} {body}")
+            return body
+
+        def register(user):
+            body = call(user, 'POST', 'register', 201,
+                        {'email': user['email'], 'password': PASSWORD, 'user_type': 'customer'})
+            user['access'] = body['access_token']
+
+        def verify(user):
+            call(user, 'GET', 'email-verify', 200, path=f"{reverse('email-verify')}?token={user['access']}")
+
+        def complete_profile(user):
+            call(user, 'PATCH', 'complete-customer-profile', 200,
+                 {'phone': '0911000000', 'location': 'Addis Ababa'}, token=user['access'])
+
+        def login(user):
+            user.update(call(user, 'POST', 'login', 200, {'email': user['email'], 'password': PASSWORD}))
+
+        def logout(user):
+            call(user, 'POST', 'logout', 205, {'refresh': user['refresh']}, token=user['access'])
+
+        def request_reset(user):
+            call(user, 'POST', 'request-reset-email', 200, {'email': user['email']})
+
+        def check_reset_link(user):
+            call(user, 'GET', 'password-reset-confirm', 301, path=user['reset_path'])
+
+        def set_new_password(user):
+            uidb64, token = user['reset_path'].split('?')[0].strip('/').split('/')[-2:]
+            call(user, 'PATCH', 'password-reset-complete', 200,
+                 {'password': NEW_PASSWORD, 'uidb64': uidb64, 'token': token})
+
+        phase('register', register)
+        phase('email-verify', verify)
+        phase('complete-customer-profile', complete_profile)
+        phase('login', login)
+        phase('logout', logout)
+        phase('request-reset-email', request_reset)
+        self.collect_reset_links(sink, users)
+        phase('password-reset-confirm', check_reset_link)
+        phase('password-reset-complete', set_new_password)
+
+    @staticmethod
+    def collect_reset_links(sink, users):
+        """Deliver the queued emails to the sink and pick each user's reset link out of them."""
+        drain(mail_connection=sink.connection())
+        for user in users:
+            message = sink.find(user['email'], 'Reset your password')
+            if message is None:
+                raise CommandError(f"No password reset email reached the SMTP sink for {user['email']}.")
+            url = urlsplit(LINK.search(message.get_content()).group())
+            user['reset_path'] = f'{url.path}?{url.query}'
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from authentication.benchmarks import Stopwatch, temporary_database
+from authentication.models import User
+from authentication.tokens import HireHubAccessToken, HireHubRefreshToken
+from authentication.utils import QueryCounter
+
+KEY = 'bench-gateway-key'
+
+
+class Command(BaseCommand):
+    help = "Compare introspecting tokens one per request with POST /token/introspect/ batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=500)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with temporary_database(), override_settings(TOKEN_INTROSPECTION_KEYS=[KEY],
+                                                     TOKEN_INTROSPECTION_MAX_BATCH=options['batch_size']):
+            users = [User.objects.create_user(f'bench-introspect-{i}@example.com', None, user_type='customer')
+                     for i in range(20)]
+            # A gateway's mix: mostly access tokens, some refresh tokens, a
+            # few of them revoked by a logout.
+            tokens = []
+            for i in range(options['tokens']):
+                user = users[i % len(users)]
+                if i % 5:
+                    tokens.append(str(HireHubAccessToken.for_user(user)))
+                else:
+                    refresh = HireHubRefreshToken.for_user(user)
+                    if i % 25 == 0:
+                        refresh.blacklist()
+                    tokens.append(str(refresh))
+
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {KEY}')
+            path = reverse('token-introspect')
+            batch_size = options['batch_size']
+            single = self.run(client, path, [[token] for token in tokens])
+            batched = self.run(client, path, [tokens[i:i + batch_size] for i in range(0, len(tokens), batch_size)])
+            if single['results'] != batched['results']:
+                raise CommandError("Batched results differ from single-token results.")
+
+            revoked = sum(result['revoked'] for result in batched['results'] if result['active'] is False)
+            self.stdout.write(f"{len(tokens)} tokens, {revoked} revoked")
+            for name, run in (('one per request', single), (f'batches of {batch_size}', batched)):
+                self.stdout.write(
+                    f"{name:<20} {run['requests']:>5} requests  {run['elapsed'] * 1000:>9.1f} ms  "
+                    f"{run['elapsed'] / len(tokens) * 1e6:>7.1f} us/token  {run['queries']:>5} queries")
+
+    @staticmethod
+    def run(client, path, batches):
+        results = []
+        with Stopwatch() as watch, QueryCounter() as counter:
+            for batch in batches:
+                response = client.post(path, {'tokens': batch}, content_type='application/json')
+                if response.status_code != 200:
+                    raise CommandError(f"HTTP {response.status_code}: {response.content[:300]}")
+                results.extend(response.json()['results'])
+        return {'requests': len(batches), 'elapsed': watch.elapsed, 'queries': counter.count, 'results': results}
@@ -0,0 +1,81 @@
+import io
+import timeit
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import CustomerProfile, ProviderProfile, User
+from authentication.renderers import FastJSONParser, FastJSONRenderer, orjson
+from authentication.serializers import CustomerProfileSerializer, ProviderProfileSerializer
+
+
+def provider(i):
+    user = User(id=i, email=f'provider{i}@example.com', user_type='provider')
+    return ProviderProfile(
+        id=i, user=user, skills='Plumbing, tiling and general repairs', service_area='Bole',
+        hourly_rate=Decimal('12.50') + i, location='Bole, Addis Ababa', latitude=8.99 + i / 1000,
+        longitude=38.79, is_profile_complete=True)
+
+
+def listing(rows):
+    return {
+        'next': 'http://testserver/providers/?cursor=eyJ2IjpbMTIuNSwxXSwiciI6MH0',
+        'previous': None,
+        'results': ProviderProfileSerializer([provider(i) for i in range(rows)], many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare FastJSONRenderer/FastJSONParser with DRF's JSON renderer and parser on API payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help="Calls per timing run.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson isn't installed; the fast classes use the stdlib."))
+        customer = CustomerProfile(id=1, user=User(id=1, email='customer@example.com', user_type='customer'),
+                                   phone='0911000000', location='Addis Ababa', is_profile_complete=True)
+        payloads = {
+            'customer profile': CustomerProfileSerializer(customer).data,
+            'provider profile': ProviderProfileSerializer(provider(1)).data,
+            'listing, 20 rows': listing(20),
+            'listing, 100 rows': listing(100),
+            # Raw values the encoder has to convert itself.
+            'Decimal/datetime/lazy': {
+                'hourly_rate': Decimal('12.50'), 'created': timezone.now(), 'naive': timezone.now().replace(tzinfo=None),
+                'date': timezone.now().date(), 'label': gettext_lazy('Provider'), 'window': timedelta(minutes=90),
+            },
+        }
+        stock, fast = JSONRenderer(), FastJSONRenderer()
+
+        self.stdout.write(f"{'render':<24} {'JSONRenderer us':>16} {'FastJSONRenderer us':>20} {'speedup':>8}")
+        for name, data in payloads.items():
+            expected, actual = stock.render(data), fast.render(data)
+            if actual != expected:
+                raise CommandError(f"{name}: output differs\n  {expected[:200]}\n  {actual[:200]}")
+            before = self.time(lambda: stock.render(data), options)
+            after = self.time(lambda: fast.render(data), options)
+            self.stdout.write(f"{name:<24} {before:>16.2f} {after:>20.2f} {before / after:>7.1f}x")
+
+        self.stdout.write(f"\n{'parse':<24} {'JSONParser us':>16} {'FastJSONParser us':>20} {'speedup':>8}")
+        stock_parser, fast_parser = JSONParser(), FastJSONParser()
+        for name in ('provider profile', 'listing, 100 rows'):
+            body = stock.render(payloads[name])
+            if fast_parser.parse(io.BytesIO(body)) != stock_parser.parse(io.BytesIO(body)):
+                raise CommandError(f"{name}: parsed data differs")
+            before = self.time(lambda: stock_parser.parse(io.BytesIO(body)), options)
+            after = self.time(lambda: fast_parser.parse(io.BytesIO(body)), options)
+            self.stdout.write(f"{name:<24} {before:>16.2f} {after:>20.2f} {before / after:>7.1f}x")
+
+    @staticmethod
+    def time(func, options):
+        """Best per-call time in microseconds."""
+        runs = timeit.repeat(func, number=options['number'], repeat=options['repeat'])
+        return min(runs) / options['number'] * 1e6
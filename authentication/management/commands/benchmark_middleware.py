@@ -0,0 +1,97 @@
+import gc
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from authentication.benchmarks import Stopwatch, format_summary, summarize, temporary_database
+from authentication.models import User
+from authentication.tokens import HireHubAccessToken
+
+
+class SessionQueryCounter:
+    def __init__(self):
+        self.total = 0
+        self.session = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        if 'django_session' in sql:
+            self.session += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare API requests through the full middleware stack with the path-routed "
+        "API_MIDDLEWARE chain: latency, and queries against the session table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            customer = User.objects.create_user('bench-mw@example.com', 'bench-password-123', user_type='customer')
+            User.objects.filter(pk=customer.pk).update(is_verified=True)
+            token = str(HireHubAccessToken.for_user(customer))
+            staff = User.objects.create_user('bench-staff@example.com', 'bench-password-123',
+                                             user_type='customer', is_staff=True)
+            # A browser that also uses the admin sends its session and CSRF cookies to the API.
+            browser = Client()
+            browser.force_login(staff)
+            browser.get(reverse('admin:index'))
+            cookies = browser.cookies
+
+            scenarios = (
+                ('anonymous provider list', reverse('provider-list'), {}, None),
+                ('JWT profile GET', reverse('complete-customer-profile'), {'Authorization': f'Bearer {token}'}, None),
+                ('JWT profile GET + cookies', reverse('complete-customer-profile'),
+                 {'Authorization': f'Bearer {token}'}, cookies),
+            )
+            for name, path, headers, scenario_cookies in scenarios:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}: GET {path}"))
+                clients = {}
+                for label, prefixes in (('full stack', ['/']), ('routed', None)):
+                    overrides = {'FULL_MIDDLEWARE_PREFIXES': prefixes} if prefixes else {}
+                    with override_settings(**overrides):
+                        clients[label] = self.make_client(path, headers, scenario_cookies)
+                results = self.measure(clients, path, headers, options['requests'])
+                for label, (summary, counter) in results.items():
+                    self.stdout.write(
+                        f"{format_summary(label, summary)}  queries {counter.total / summary['requests']:.2f}  "
+                        f"session {counter.session / summary['requests']:.2f}")
+
+    @staticmethod
+    def make_client(path, headers, cookies):
+        client = Client()
+        if cookies:
+            client.cookies = cookies
+        # The first request builds the middleware chains under the current
+        # settings; the rest fill caches.
+        for _ in range(20):
+            assert client.get(path, headers=headers).status_code == 200
+        return client
+
+    @staticmethod
+    def measure(clients, path, headers, requests, rounds=20):
+        """Alternate between the clients in rounds so drift on the host affects both alike."""
+        latencies = {label: [] for label in clients}
+        elapsed = dict.fromkeys(clients, 0.0)
+        counters = {label: SessionQueryCounter() for label in clients}
+        gc.collect()
+        gc.freeze()
+        try:
+            for _ in range(rounds):
+                for label, client in clients.items():
+                    with Stopwatch() as watch, connection.execute_wrapper(counters[label]):
+                        for _ in range(requests // rounds):
+                            start = time.perf_counter()
+                            client.get(path, headers=headers)
+                            latencies[label].append(time.perf_counter() - start)
+                    elapsed[label] += watch.elapsed
+        finally:
+            gc.unfreeze()
+        return {label: (summarize(latencies[label], elapsed[label]), counters[label]) for label in clients}
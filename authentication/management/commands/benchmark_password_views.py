@@ -0,0 +1,108 @@
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches
+
+from authentication.benchmarks import Stopwatch, format_summary, summarize, temporary_database
+from authentication.hashing import shutdown_pool, warm_pool
+from authentication.models import User
+
+PASSWORD = 'bench-password-123'
+
+
+def reload_urls():
+    import importlib
+
+    import authentication.urls
+    import HireHub.urls
+    importlib.reload(authentication.urls)
+    importlib.reload(HireHub.urls)
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = "Compare login/register throughput of the sync views and the async process-pool views."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Concurrent registrations need a real file: the in-memory test
+            # database fails writers with "table is locked" instead of waiting.
+            connection.settings_dict['TEST'] = {**connection.settings_dict.get('TEST', {}),
+                                                'NAME': os.path.join(tmp, 'bench.sqlite3')}
+            results = self.benchmark(options)
+
+        for name, summary in results:
+            self.stdout.write(format_summary(name, summary))
+
+    def benchmark(self, options):
+        with temporary_database():
+            user = User.objects.create_user('bench-login@example.com', PASSWORD, user_type='customer')
+            User.objects.filter(pk=user.pk).update(is_verified=True)
+            user.customerprofile.is_profile_complete = True
+            user.customerprofile.save()
+
+            results = []
+            with override_settings(ASYNC_PASSWORD_VIEWS=False):
+                reload_urls()
+                results.append(('sync login', self.run_sync('/login/', self.login_body, options)))
+                results.append(('sync register', self.run_sync('/register/', self.register_body('sync'), options)))
+
+            with override_settings(ASYNC_PASSWORD_VIEWS=True):
+                reload_urls()
+                warm_pool()
+                try:
+                    results.append(('async login', self.run_async('/login/', self.login_body, options)))
+                    results.append(('async register', self.run_async('/register/', self.register_body('async'), options)))
+                finally:
+                    shutdown_pool()
+            reload_urls()
+        return results
+
+    @staticmethod
+    def login_body(i):
+        return {'email': 'bench-login@example.com', 'password': PASSWORD}
+
+    @staticmethod
+    def register_body(prefix):
+        def body(i):
+            return {'email': f'bench-{prefix}-{i}@example.com', 'password': PASSWORD, 'user_type': 'customer'}
+        return body
+
+    def run_sync(self, path, body, options):
+        def call(i):
+            start = time.perf_counter()
+            response = Client().post(path, body(i), content_type='application/json')
+            assert response.status_code < 300, response.content
+            return time.perf_counter() - start
+
+        with Stopwatch() as watch, ThreadPoolExecutor(options['concurrency']) as executor:
+            latencies = list(executor.map(call, range(options['requests'])))
+        return summarize(latencies, watch.elapsed)
+
+    def run_async(self, path, body, options):
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def call(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(path, body(i), content_type='application/json')
+                    assert response.status_code < 300, response.content
+                    return time.perf_counter() - start
+
+            return await asyncio.gather(*(call(i) for i in range(options['requests'])))
+
+        with Stopwatch() as watch:
+            latencies = asyncio.run(run())
+        return summarize(latencies, watch.elapsed)
@@ -0,0 +1,98 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from authentication.benchmarks import temporary_database
+from authentication.models import ProviderProfile, User
+from authentication.pagination import KeysetPagination
+from authentication.views import ProviderListView
+
+AREAS = ('Bole', 'Kirkos', 'Arada', 'Yeka', 'Lideta', 'Gulele')
+SCENARIOS = (('newest', None), ('rate', None), ('-rate', 'Bole'))
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+class Command(BaseCommand):
+    help = "Time the provider listing at increasing page depths, against OFFSET pagination."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    @override_settings(PROVIDER_CACHE_TTL=0)
+    def handle(self, *args, **options):
+        # Caching is off so every request below pays for its query.
+        with temporary_database():
+            self.stdout.write(f"Creating {options['rows']} provider profiles...")
+            started = time.perf_counter()
+            self.populate(options['rows'])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.stdout.write(f"Done in {time.perf_counter() - started:.0f}s.")
+
+            client = Client()
+            url = reverse('provider-list')
+            page_size = options['page_size']
+            for sort, service_area in SCENARIOS:
+                params = {'sort': sort, 'page_size': page_size}
+                if service_area:
+                    params['service_area'] = service_area
+                ordering = ProviderListView.orderings[sort]
+                queryset = ProviderProfile.objects.filter(is_profile_complete=True)
+                if service_area:
+                    queryset = queryset.filter(service_area=service_area)
+                queryset = queryset.select_related('user').order_by(*ordering)
+                total = queryset.count()
+
+                self.stdout.write(f"\nGET {url}?sort={sort}" + (f"&service_area={service_area}" if service_area else '')
+                                  + f"  ({total} matching rows)")
+                self.stdout.write(f"{'page':>8} {'keyset (API) ms':>16} {'offset (query) ms':>18}")
+                for depth in self.depths(total, page_size):
+                    page_params = dict(params)
+                    if depth:
+                        # The cursor a client holds after paging ``depth`` rows in.
+                        page_params['cursor'] = KeysetPagination.make_cursor(ordering, queryset[depth - 1])
+                    keyset = median_ms(lambda: client.get(url, page_params), options['repeat'])
+                    offset = median_ms(lambda: list(queryset[depth:depth + page_size]), options['repeat'])
+                    self.stdout.write(f"{depth // page_size + 1:>8} {keyset:>16.2f} {offset:>18.2f}")
+
+    @staticmethod
+    def depths(total, page_size):
+        depths = [0]
+        depth = page_size * 100
+        while depth < total:
+            depths.append(depth)
+            depth *= 10
+        depths.append((total - 1) // page_size * page_size)
+        return sorted(set(depths))
+
+    @staticmethod
+    def populate(rows, chunk=10_000):
+        rng = random.Random(0)
+        for start in range(0, rows, chunk):
+            count = min(chunk, rows - start)
+            users = User.objects.bulk_create(
+                User(email=f'bench{start + i}@example.com', user_type='provider', password='!')
+                for i in range(count))
+            ProviderProfile.objects.bulk_create(
+                ProviderProfile(
+                    user=user, skills='bench', service_area=rng.choice(AREAS), location='',
+                    hourly_rate=Decimal(rng.randint(500, 20000)) / 100,
+                    is_profile_complete=rng.random() < 0.9,
+                )
+                for user in users)
@@ -0,0 +1,81 @@
+import time
+from unittest import mock
+
+from allauth.socialaccount.providers.facebook.views import FacebookOAuth2Adapter
+from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from authentication.benchmarks import Stopwatch, format_summary, summarize, temporary_database
+from authentication.models import User
+from social_auth.idp import StandInIdentityProvider
+from social_auth.views import FacebookLogin, GoogleLogin
+
+CLIENT_ID = 'bench-client'
+APPS = {
+    provider: {'APP': {'client_id': CLIENT_ID, 'secret': 'bench-secret', 'key': ''}}
+    for provider in ('google', 'facebook')
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time Google and Facebook logins against a local stand-in identity provider with "
+        "simulated network latency, with allauth's stock adapters and with the cached ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Logins per access token, e.g. a client retrying or re-opening the app.")
+        parser.add_argument('--latency-ms', type=float, default=50.0,
+                            help="Added to every identity provider response.")
+
+    def handle(self, *args, **options):
+        with temporary_database(), StandInIdentityProvider(latency=options['latency_ms'] / 1000) as idp, \
+                override_settings(SOCIALACCOUNT_PROVIDERS=APPS, GOOGLE_JWKS_URL=idp.jwks_url,
+                                  GOOGLE_USERINFO_URL=idp.userinfo_url, FACEBOOK_GRAPH_URL=idp.url), \
+                mock.patch('allauth.socialaccount.providers.google.views.CERTS_URL', idp.certs_url), \
+                mock.patch.object(GoogleOAuth2Adapter, 'identity_url', idp.userinfo_url), \
+                mock.patch('allauth.socialaccount.providers.facebook.flows.GRAPH_API_URL', idp.url):
+            emails = [f'bench-social-{i}@example.com' for i in range(options['users'])]
+            for email in emails:
+                User.objects.create_user(email, None, user_type='customer')
+
+            scenarios = (
+                ('google id_token', GoogleLogin, GoogleOAuth2Adapter, '/auth/google/',
+                 lambda email: {'access_token': idp.issue_access_token(email),
+                                'id_token': idp.issue_id_token(email, CLIENT_ID)}, 1),
+                ('google access_token', GoogleLogin, GoogleOAuth2Adapter, '/auth/google/',
+                 lambda email: {'access_token': idp.issue_access_token(email)}, options['repeat']),
+                ('facebook access_token', FacebookLogin, FacebookOAuth2Adapter, '/auth/facebook/',
+                 lambda email: {'access_token': idp.issue_access_token(email)}, options['repeat']),
+            )
+            # One login per account first, which links the social accounts.
+            # (The URL names clash with allauth's own, hence the literal paths.)
+            for _, view, _, path, credentials, _ in scenarios:
+                self.run(path, emails, credentials, 1)
+
+            for name, view, stock_adapter, path, credentials, repeat in scenarios:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name} ({repeat} login(s) per token)"))
+                for label, adapter in (('stock adapter', stock_adapter), ('cached adapter', view.adapter_class)):
+                    with mock.patch.object(view, 'adapter_class', adapter):
+                        hits = sum(idp.hits.values())
+                        summary = self.run(path, emails, credentials, repeat)
+                    calls = (sum(idp.hits.values()) - hits) / summary['requests']
+                    self.stdout.write(f"{format_summary(label, summary)}  provider calls/login {calls:.2f}")
+
+    @staticmethod
+    def run(path, emails, credentials, repeat):
+        client = Client()
+        latencies = []
+        with Stopwatch() as watch:
+            for email in emails:
+                data = credentials(email)
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = client.post(path, data, content_type='application/json')
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f"{path} for {email}: HTTP {response.status_code} {response.content[:300]}")
+        return summarize(latencies, watch.elapsed)
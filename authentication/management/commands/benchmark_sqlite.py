@@ -0,0 +1,118 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connection, connections, transaction
+
+from authentication.benchmarks import temporary_database
+from authentication.models import ProviderProfile, User
+
+
+def reader(settings_dict, seconds, results):
+    """Provider listing queries, one per simulated request, as fast as possible."""
+    connection.settings_dict.update(settings_dict)
+    reads = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        try:
+            list(ProviderProfile.objects.filter(is_profile_complete=True).select_related('user')
+                 .order_by('-id')[:20])
+            reads += 1
+        except OperationalError:
+            errors += 1
+        close_old_connections()
+    results.put(('read', reads, errors))
+
+
+def writer(settings_dict, seconds, results):
+    """Read-then-write transactions, like the profile PATCH, plus registrations."""
+    connection.settings_dict.update(settings_dict)
+    writes = errors = 0
+    profile_ids = list(ProviderProfile.objects.values_list('id', flat=True))
+    close_old_connections()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        try:
+            with transaction.atomic():
+                profile = ProviderProfile.objects.select_for_update().get(pk=random.choice(profile_ids))
+                profile.hourly_rate += 1
+                profile.save(update_fields=['hourly_rate'])
+                User.objects.create(email=f'bench-sqlite-{os.getpid()}-{writes}-{errors}@example.com',
+                                    user_type='provider', password='!')
+            writes += 1
+        except OperationalError:
+            errors += 1
+        close_old_connections()
+    results.put(('write', writes, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure provider-listing reads/sec across processes while other processes write, with "
+        "the old SQLite setup (rollback journal, a connection per request) and with the "
+        "configured one (WAL, pragmas, persistent connections)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=max(2, os.cpu_count()))
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--providers', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES[DEFAULT_DB_ALIAS]
+        setups = {
+            'per-request, rollback journal': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}},
+            'configured': {key: configured[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            # Locking only shows up with a real file, not the in-memory test database.
+            connection.settings_dict['TEST'] = {**connection.settings_dict.get('TEST', {}),
+                                                'NAME': os.path.join(tmp, 'bench.sqlite3')}
+            with temporary_database():
+                User.objects.bulk_create(
+                    User(email=f'bench-sqlite-provider-{i}@example.com', user_type='provider', password='!')
+                    for i in range(options['providers']))
+                ProviderProfile.objects.bulk_create(
+                    ProviderProfile(user=user, skills='Plumbing', service_area='Bole', hourly_rate=10 + i % 40,
+                                    is_profile_complete=True)
+                    for i, user in enumerate(User.objects.all()))
+                path = connection.settings_dict['NAME']
+                for name, setup in setups.items():
+                    self.run(name, path, setup, options)
+
+    def run(self, name, path, setup, options):
+        connections.close_all()
+        journal_mode = 'WAL' if 'journal_mode=WAL' in setup['OPTIONS'].get('init_command', '') else 'DELETE'
+        with sqlite3.connect(path) as conn:
+            conn.execute(f'PRAGMA journal_mode={journal_mode}')
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = (
+            [context.Process(target=reader, args=(setup, options['seconds'], results))
+             for _ in range(options['readers'])]
+            + [context.Process(target=writer, args=(setup, options['seconds'], results))
+               for _ in range(options['writers'])]
+        )
+        for worker in workers:
+            worker.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in workers:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for worker in workers:
+            worker.join()
+
+        seconds = options['seconds']
+        self.stdout.write(
+            f"{name:<32} reads {totals['read'][0] / seconds:>8.0f}/s ({totals['read'][1]} failed)  "
+            f"writes {totals['write'][0] / seconds:>6.0f}/s ({totals['write'][1]} failed: database is locked)")
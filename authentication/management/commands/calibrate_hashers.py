@@ -0,0 +1,138 @@
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.crypto import get_random_string
+
+from authentication.hashers import CalibratedScryptPasswordHasher
+
+PASSWORD = 'calibration-password'
+# Preferred order when several hashers fit the budget.
+PREFERENCE = ('argon2', 'scrypt', 'pbkdf2_sha256')
+
+
+def time_call(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def calibrate_pbkdf2(target, repeat):
+    hasher = PBKDF2PasswordHasher()
+    salt = hasher.salt()
+    probe = 100_000
+    elapsed = time_call(lambda: hasher.encode(PASSWORD, salt, probe), repeat)
+    # Never below Django's default: slow hosts get a slower login, not a weaker hash.
+    iterations = max(PBKDF2PasswordHasher.iterations, int(probe * target / elapsed) // 10_000 * 10_000)
+    elapsed = time_call(lambda: hasher.encode(PASSWORD, salt, iterations), repeat)
+    return {'PBKDF2_ITERATIONS': iterations}, elapsed
+
+
+def calibrate_scrypt(target, repeat):
+    salt = get_random_string(22)
+
+    def run(work_factor):
+        hasher = type('Probe', (CalibratedScryptPasswordHasher,), {'work_factor': work_factor})()
+        return time_call(lambda: hasher.encode(PASSWORD, salt), repeat)
+
+    # Work factors must be powers of two: double from Django's default while under budget.
+    work_factor = ScryptPasswordHasher.work_factor
+    elapsed = run(work_factor)
+    while elapsed * 2 <= target and work_factor < 2 ** 20:
+        work_factor *= 2
+        elapsed = run(work_factor)
+    return {'SCRYPT_WORK_FACTOR': work_factor}, elapsed
+
+
+def calibrate_argon2(target, repeat):
+    try:
+        hasher = Argon2PasswordHasher()
+        hasher._load_library()
+    except ValueError:
+        return None
+    salt = hasher.salt()
+
+    def run(time_cost):
+        probe = type('Probe', (Argon2PasswordHasher,), {'time_cost': time_cost})()
+        return time_call(lambda: probe.encode(PASSWORD, salt), repeat)
+
+    time_cost = 1
+    elapsed = run(time_cost)
+    time_cost = max(Argon2PasswordHasher.time_cost, int(target / elapsed))
+    elapsed = run(time_cost)
+    return {'ARGON2_TIME_COST': time_cost, 'ARGON2_MEMORY_COST': Argon2PasswordHasher.memory_cost}, elapsed
+
+
+CALIBRATORS = {
+    'pbkdf2_sha256': calibrate_pbkdf2,
+    'scrypt': calibrate_scrypt,
+    'argon2': calibrate_argon2,
+}
+
+
+def update_env_file(path, values):
+    lines = path.read_text().splitlines() if path.exists() else []
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if key in remaining:
+            lines[i] = f'{key}={remaining.pop(key)}'
+    lines.extend(f'{key}={value}' for key, value in remaining.items())
+    path.write_text('\n'.join(lines) + '\n')
+
+
+class Command(BaseCommand):
+    help = "Benchmark the password hashers on this machine and recommend cost parameters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help="Target time for one hash verification, in milliseconds.")
+        parser.add_argument('--hasher', choices=sorted(CALIBRATORS),
+                            help="Hasher to recommend instead of the preferred available one.")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--write', action='store_true',
+                            help="Store the recommendation in the .env file read by settings.")
+        parser.add_argument('--env-file', default=str(Path(settings.BASE_DIR) / '.env'))
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        results = {}
+        for name, calibrate in CALIBRATORS.items():
+            if options['hasher'] and name != options['hasher']:
+                continue
+            result = calibrate(target, options['repeat'])
+            if result is None:
+                self.stdout.write(f"{name:<14} not available (library not installed)")
+                continue
+            params, elapsed = result
+            results[name] = (params, elapsed)
+            formatted = ', '.join(f'{k}={v}' for k, v in params.items())
+            self.stdout.write(f"{name:<14} {elapsed * 1000:>8.1f} ms  {formatted}")
+
+        if not results:
+            raise CommandError("No password hasher could be calibrated.")
+        chosen = options['hasher']
+        if chosen is None:
+            # The most preferred hasher that fits the budget, else the fastest one.
+            within_budget = [name for name in PREFERENCE
+                             if name in results and results[name][1] <= target * 1.25]
+            chosen = within_budget[0] if within_budget else min(results, key=lambda n: results[n][1])
+        recommendation = {'PASSWORD_HASHER': chosen, **results[chosen][0]}
+        self.stdout.write(self.style.SUCCESS(
+            "Recommended: " + ' '.join(f'{k}={v}' for k, v in recommendation.items())))
+
+        if options['write']:
+            update_env_file(Path(options['env_file']), recommendation)
+            self.stdout.write(
+                f"Wrote {options['env_file']}. Restart the workers to apply; existing hashes "
+                "are upgraded on each user's next successful login.")
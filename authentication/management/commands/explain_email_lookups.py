@@ -0,0 +1,83 @@
+from allauth.socialaccount.models import SocialAccount, SocialLogin
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.client import AsyncRequestFactory, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from authentication.async_views import AsyncLoginView
+from authentication.benchmarks import temporary_database
+from authentication.models import OutgoingEmail, User
+from social_auth.adapters import CustomSocialAccountAdapter
+
+INDEX = 'user_email_lower_idx'
+PASSWORD = 'Explain-email-lookups-1'
+
+
+class Command(BaseCommand):
+    help = (
+        "Run every email lookup path (login, async login, password reset, social account "
+        "linking, natural key) against a throwaway database and check with EXPLAIN that "
+        f"each one seeks {INDEX}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000,
+                            help="Rows in the table, so the planner has a reason to prefer the index.")
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            User.objects.bulk_create(
+                User(email=f'explain-{i}@example.com', user_type='customer', password='!')
+                for i in range(options['users'])
+            )
+            user = User.objects.create_user('Explain.Me@Example.com', PASSWORD, user_type='customer',
+                                            is_verified=True)
+            # Every path is given the address in a different case than it was registered with.
+            email = 'explain.me@example.COM'
+            # Each path returns whether it found the account.
+            paths = {
+                'login': lambda: authenticate(None, email=email, password=PASSWORD) == user,
+                'async login': lambda: async_to_sync(AsyncLoginView.as_view())(
+                    AsyncRequestFactory().post('/login/', {'email': email, 'password': PASSWORD},
+                                               content_type='application/json')).status_code != 401,
+                'password reset': lambda: Client().post(
+                    reverse('request-reset-email'), {'email': email}, content_type='application/json',
+                ) and OutgoingEmail.objects.filter(to_email=user.email).exists(),
+                'social account linking': lambda: CustomSocialAccountAdapter().pre_social_login(
+                    RequestFactory().get('/'),
+                    SocialLogin(user=User(email=email),
+                                account=SocialAccount(provider='google', uid='explain', extra_data={'email': email})),
+                ) or user.socialaccount_set.exists(),
+                'natural key': lambda: User.objects.get_by_natural_key(email) == user,
+            }
+
+            failed = []
+            for name, run in paths.items():
+                with CaptureQueriesContext(connection) as queries:
+                    found = run()
+                lookups = [query['sql'] for query in queries.captured_queries
+                           if 'LOWER("authentication_user"."email")' in query['sql']]
+                plans = [self.explain(sql) for sql in lookups]
+                ok = found and bool(plans) and all(INDEX in plan for plan in plans)
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                status = "" if ok else (" NOT using the index" if found else " did not find the account")
+                self.stdout.write(style(f"{name}: {len(lookups)} lookup(s){status}"))
+                for plan in plans:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                if not ok:
+                    failed.append(name)
+
+            if failed:
+                raise CommandError(f"Failed: {', '.join(failed)}")
+
+    @staticmethod
+    def explain(sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            rows = cursor.fetchall()
+        # SQLite's EXPLAIN QUERY PLAN rows are (id, parent, notused, detail).
+        return '\n'.join(str(row[-1]) for row in rows)
@@ -0,0 +1,35 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from authentication.export import FORMATS, export_rows
+from authentication.models import USER_TYPE_CHOICES, User
+
+
+class Command(BaseCommand):
+    help = "Stream every user and its profile to a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="File to write; defaults to standard output.")
+        parser.add_argument('--user-type', choices=[value for value, _ in USER_TYPE_CHOICES])
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = User.objects.order_by('id')
+        if options['user_type']:
+            queryset = queryset.filter(user_type=options['user_type'])
+        lines, _ = FORMATS[options['format']]
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        count = 0
+        try:
+            for line in lines(export_rows(queryset, options['chunk_size'])):
+                out.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                out.close()
+        if options['output']:
+            rows = count - 1 if options['format'] == 'csv' else count
+            self.stderr.write(self.style.SUCCESS(f"Exported {rows} user(s) to {options['output']}."))
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.cache import PROVIDER_NAMESPACE, cache
+from authentication.geo import geocode, load_gazetteer
+from authentication.models import ProviderProfile
+
+
+class Command(BaseCommand):
+    help = "Backfill ProviderProfile coordinates from an offline gazetteer file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gazetteer', default=getattr(settings, 'GEO_GAZETTEER_PATH', None),
+                            help="CSV file with name, latitude and longitude columns.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true',
+                            help="Re-geocode every profile, not only those without coordinates.")
+
+    def handle(self, *args, **options):
+        path = options['gazetteer']
+        if not path:
+            raise CommandError("No gazetteer given; pass --gazetteer or set GEO_GAZETTEER_PATH.")
+        try:
+            load_gazetteer(path)
+        except OSError as e:
+            raise CommandError(f"Cannot read gazetteer: {e}")
+
+        queryset = ProviderProfile.objects.exclude(location='')
+        if not options['all']:
+            queryset = queryset.filter(latitude__isnull=True)
+
+        last_id = 0
+        matched = scanned = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'location', 'latitude', 'longitude', 'geohash')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            scanned += len(batch)
+
+            updated = []
+            for profile in batch:
+                coordinates = geocode(profile.location, path)
+                if coordinates is not None:
+                    profile.set_coordinates(coordinates)
+                    updated.append(profile)
+            ProviderProfile.objects.bulk_update(updated, ['latitude', 'longitude', 'geohash'])
+            matched += len(updated)
+
+        # bulk_update sends no signals, so drop cached listings here.
+        cache.invalidate(PROVIDER_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {matched} of {scanned} provider profile(s)."))
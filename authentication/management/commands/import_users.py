@@ -0,0 +1,225 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+
+from authentication.cache import PROVIDER_NAMESPACE, cache
+from authentication.geo import geocode
+from authentication.hashing import make_passwords, shutdown_pool
+from authentication.models import CustomerProfile, ProviderProfile, User, default_profile
+from authentication.search import get_search_backend
+
+IMPORTABLE_TYPES = ('customer', 'provider')
+PROFILE_FIELDS = {
+    'customer': ('phone', 'location'),
+    'provider': ('skills', 'service_area', 'hourly_rate', 'location'),
+}
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+
+def read_records(path, fmt):
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_record(record):
+    """Return ``(user, profile_values, password, encoded_password)`` or raise ValueError."""
+    email = User.objects.normalize_email((record.get('email') or '').strip())
+    if not email:
+        raise ValueError("email is required")
+    user_type = (record.get('user_type') or '').strip()
+    if user_type not in IMPORTABLE_TYPES:
+        raise ValueError(f"user_type must be one of {', '.join(IMPORTABLE_TYPES)}")
+
+    is_verified = str(record.get('is_verified') or '').strip().lower() in TRUE_VALUES
+    user = User(email=email, user_type=user_type, is_verified=is_verified)
+
+    profile_values = {}
+    for field in PROFILE_FIELDS[user_type]:
+        value = record.get(field)
+        if value in (None, ''):
+            continue
+        if field == 'hourly_rate':
+            try:
+                profile_values[field] = Decimal(str(value))
+            except InvalidOperation:
+                raise ValueError("hourly_rate is not a number")
+        else:
+            profile_values[field] = str(value).strip()
+    return user, profile_values, record.get('password') or None, record.get('password_hash') or None
+
+
+class Checkpoint:
+    """Number of input records already handled, stored next to the input file."""
+
+    def __init__(self, path, source):
+        self.path = Path(path)
+        self.source = str(Path(source).resolve())
+
+    def load(self):
+        if not self.path.exists():
+            return 0
+        data = json.loads(self.path.read_text())
+        if data.get('source') != self.source:
+            raise CommandError(f"Checkpoint {self.path} belongs to {data.get('source')}; pass --restart.")
+        return data['processed']
+
+    def save(self, processed):
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps({'source': self.source, 'processed': processed}))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users and their profiles from a CSV or JSONL file. Columns: email, user_type, "
+        "password or password_hash, and optionally is_verified and the profile fields."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help="Input format; guessed from the file extension by default.")
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows hashed and inserted per transaction.")
+        parser.add_argument('--checkpoint', help="Checkpoint file; defaults to <path>.checkpoint.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore an existing checkpoint and start from the first record.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate the input and report what would be imported, without writing.")
+        parser.add_argument('--allow-no-password', action='store_true',
+                            help="Import records without password or password_hash with an unusable "
+                                 "password (they can only log in after a password reset) instead of "
+                                 "reporting them as invalid.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        self.dry_run = options['dry_run']
+        self.allow_no_password = options['allow_no_password']
+        self.backend = get_search_backend()
+
+        checkpoint = Checkpoint(options['checkpoint'] or f'{path}.checkpoint', path)
+        if options['restart']:
+            checkpoint.clear()
+        start = 0 if self.dry_run else checkpoint.load()
+        if start:
+            self.stdout.write(f"Resuming after record {start}.")
+
+        self.seen = set()
+        self.totals = {'created': 0, 'existing': 0, 'invalid': 0}
+        started = time.perf_counter()
+        processed = start
+        chunk = []
+        try:
+            for number, record in enumerate(read_records(path, fmt), 1):
+                if number <= start:
+                    continue
+                chunk.append((number, record))
+                if len(chunk) >= options['chunk_size']:
+                    self.import_chunk(chunk)
+                    processed = number
+                    if not self.dry_run:
+                        checkpoint.save(processed)
+                    chunk = []
+            if chunk:
+                self.import_chunk(chunk)
+                processed = chunk[-1][0]
+        except json.JSONDecodeError as e:
+            raise CommandError(f"Invalid JSON after record {processed}: {e}")
+        except IntegrityError as e:
+            raise CommandError(f"Import stopped after record {processed}: {e}. Re-run to resume.")
+        finally:
+            shutdown_pool()
+
+        if not self.dry_run:
+            checkpoint.clear()
+        elapsed = time.perf_counter() - started
+        verb = "Would import" if self.dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.totals['created']} user(s) in {elapsed:.1f}s; "
+            f"{self.totals['existing']} already existed, {self.totals['invalid']} invalid."))
+
+    def import_chunk(self, chunk):
+        rows = []
+        for number, record in chunk:
+            try:
+                user, profile_values, password, encoded_password = parse_record(record)
+            except (ValueError, AttributeError) as e:
+                self.stderr.write(f"Record {number}: {e}")
+                self.totals['invalid'] += 1
+                continue
+            if not (password or encoded_password or self.allow_no_password):
+                self.stderr.write(f"Record {number}: password or password_hash is required "
+                                  "(pass --allow-no-password to import it with an unusable password)")
+                self.totals['invalid'] += 1
+                continue
+            # Logins match emails ignoring case, so the same address in another case is a duplicate.
+            if user.email.lower() in self.seen:
+                self.stderr.write(f"Record {number}: duplicate email {user.email}")
+                self.totals['invalid'] += 1
+                continue
+            self.seen.add(user.email.lower())
+            rows.append((user, profile_values, password, encoded_password))
+
+        existing = set(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=[row[0].email.lower() for row in rows])
+            .values_list('email_lower', flat=True))
+        rows = [row for row in rows if row[0].email.lower() not in existing]
+        self.totals['existing'] += len(existing)
+        self.totals['created'] += len(rows)
+        if self.dry_run or not rows:
+            return
+
+        # Hash before opening the transaction so the write lock is held only for the INSERTs.
+        to_hash = [row for row in rows if not row[3]]
+        for row, encoded in zip(to_hash, make_passwords(row[2] for row in to_hash)):
+            row[0].password = encoded
+        for user, _, _, encoded_password in rows:
+            if encoded_password:
+                user.password = encoded_password
+
+        users = [row[0] for row in rows]
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                ids = dict(User.objects.filter(email__in=[u.email for u in users]).values_list('email', 'id'))
+                for user in users:
+                    user.pk = ids[user.email]
+
+            # Same rows the post_save signal creates, plus any profile columns in the input.
+            profiles = {CustomerProfile: [], ProviderProfile: []}
+            for user, profile_values, _, _ in rows:
+                profile = default_profile(user)
+                for field, value in profile_values.items():
+                    setattr(profile, field, value)
+                if isinstance(profile, ProviderProfile) and profile.location:
+                    profile.set_coordinates(geocode(profile.location))
+                profiles[type(profile)].append(profile)
+            for model, objs in profiles.items():
+                model.objects.bulk_create(objs)
+
+            # bulk_create() sends no post_save, so index here, in the same
+            # transaction, and drop cached listings once it commits.
+            for profile in profiles[ProviderProfile]:
+                if profile.skills or profile.service_area or profile.location:
+                    self.backend.index(profile)
+            if profiles[ProviderProfile]:
+                transaction.on_commit(lambda: cache.invalidate(PROVIDER_NAMESPACE))
@@ -0,0 +1,75 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.profiling import is_project_frame, make_token, parse_dump_name, read_dump
+
+
+class Command(BaseCommand):
+    help = (
+        "'token' prints a value for the profiling request header; 'report' merges the "
+        "stack dumps into a per-endpoint hot-path report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('token', 'report'))
+        parser.add_argument('--dir', default=settings.PROFILING_DIR)
+        parser.add_argument('--endpoint', help="Only report this URL name.")
+        parser.add_argument('--user-type', help="Only include requests made by this user type.")
+        parser.add_argument('--top', type=int, default=10, help="Frames listed per endpoint.")
+        parser.add_argument('--folded-dir',
+                            help="Also write one merged folded-stack file per endpoint here, for flamegraph tools.")
+
+    def handle(self, *args, **options):
+        if options['action'] == 'token':
+            self.stdout.write(f"{settings.PROFILING_HEADER}: {make_token()}")
+            self.stdout.write(f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds.")
+            return
+
+        directory = Path(options['dir'])
+        merged = defaultdict(Counter)
+        requests = Counter()
+        for path in sorted(directory.glob('*.folded')):
+            try:
+                url_name, user_type = parse_dump_name(path.name)
+            except ValueError:
+                continue
+            if options['endpoint'] and url_name != options['endpoint']:
+                continue
+            if options['user_type'] and user_type != options['user_type']:
+                continue
+            merged[url_name].update(read_dump(path))
+            requests[url_name] += 1
+        if not merged:
+            raise CommandError(f"No matching stack dumps in {directory}.")
+
+        for url_name in sorted(merged, key=lambda name: -sum(merged[name].values())):
+            self.report(url_name, merged[url_name], requests[url_name], options['top'])
+            if options['folded_dir']:
+                out = Path(options['folded_dir'])
+                out.mkdir(parents=True, exist_ok=True)
+                (out / f'{url_name}.folded').write_text(
+                    ''.join(f'{stack} {count}\n' for stack, count in merged[url_name].most_common()))
+
+    def report(self, url_name, samples, request_count, top):
+        total = sum(samples.values())
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in samples.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            # Count each frame once per stack, even when it recurses.
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{url_name}: {total} samples from {request_count} request(s)"))
+        self.stdout.write("  Self time:")
+        for frame, count in own.most_common(top):
+            self.stdout.write(f"  {count / total:>7.1%}  {frame}")
+        self.stdout.write("  Hottest project frames (inclusive):")
+        project = [(frame, count) for frame, count in inclusive.most_common() if is_project_frame(frame)]
+        for frame, count in project[:top]:
+            self.stdout.write(f"  {count / total:>7.1%}  {frame}")
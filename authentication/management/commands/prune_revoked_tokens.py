@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from authentication.revocation import get_revocation_list
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding/blacklisted tokens in chunks and prune the revocation store. "
+        "Workers rebuild their revocation filters from the pruned store on their next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks to leave room for other writers.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=now)
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            # Deleting an outstanding token cascades to its BlacklistedToken row.
+            OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        pruned = get_revocation_list().store.prune(int(now.timestamp()), chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired token(s); pruned {pruned} revocation store entr{'y' if pruned == 1 else 'ies'}."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from authentication.cache import PROVIDER_NAMESPACE, cache
+from authentication.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the provider search index from the ProviderProfile table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild()
+        cache.invalidate(PROVIDER_NAMESPACE)
+        if indexed is None:
+            self.stdout.write(f"{type(backend).__name__} keeps no index, nothing to rebuild.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} provider profile(s)."))
@@ -0,0 +1,57 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.keyring import ALGORITHMS, generate_key, get_token_backend, read_keyring, write_keyring
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the JWT signing key ring: create it, add a new key once the newest is "
+        "JWT_KEY_ROTATION_DAYS old, and drop keys no unexpired token can be signed with. "
+        "Safe to run as often as you like; run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--algorithm', choices=ALGORITHMS, default=settings.JWT_KEY_ALGORITHM)
+        parser.add_argument('--force', action='store_true', help="Add a new key now, whatever the newest one's age.")
+
+    def handle(self, *args, **options):
+        path = settings.JWT_KEYRING_PATH
+        entries = read_keyring(path)
+        now = timezone.now()
+        changed = False
+
+        if not entries:
+            # Nothing can have cached a key set yet, so the first key signs straight away.
+            entries.append(generate_key(options['algorithm'], now))
+            self.stdout.write(f"Created the key ring with key {entries[-1]['kid']}.")
+            changed = True
+        else:
+            newest = max(datetime.datetime.fromisoformat(entry['not_before']) for entry in entries)
+            if options['force'] or now - newest >= datetime.timedelta(days=settings.JWT_KEY_ROTATION_DAYS):
+                entry = generate_key(options['algorithm'], max(now, newest) + settings.JWT_KEY_PUBLISH_AHEAD)
+                entries.append(entry)
+                self.stdout.write(f"Added key {entry['kid']}; it signs tokens from {entry['not_before']}.")
+                changed = True
+
+        # A key can go once the key after it has been signing for longer than
+        # any token lives: nothing it signed is still valid.
+        retention = api_settings.REFRESH_TOKEN_LIFETIME + get_token_backend().get_leeway()
+        entries.sort(key=lambda entry: datetime.datetime.fromisoformat(entry['not_before']))
+        kept = []
+        for entry, successor in zip(entries, entries[1:] + [None]):
+            if successor and datetime.datetime.fromisoformat(successor['not_before']) + retention < now:
+                self.stdout.write(f"Removed key {entry['kid']}.")
+                changed = True
+            else:
+                kept.append(entry)
+
+        if changed:
+            write_keyring(path, kept)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(kept)} key(s) in {path}" + ("" if changed else "; nothing to do.")))
+
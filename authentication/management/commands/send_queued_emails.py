@@ -0,0 +1,37 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authentication.outbox import drain, run_workers
+
+
+class Command(BaseCommand):
+    help = "Deliver emails queued in the outbox table over pooled SMTP connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'EMAIL_OUTBOX_WORKERS', 2))
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50))
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait between polls when the outbox is empty.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the outbox once and exit instead of running as a worker.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            sent = drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s)."))
+            return
+
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping email workers after the current batch...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(f"Starting {options['workers']} email worker(s).")
+        run_workers(options['workers'], options['batch_size'], options['poll_interval'], stop_event)
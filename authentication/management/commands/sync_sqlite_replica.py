@@ -0,0 +1,61 @@
+import signal
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from authentication.routers import REPLICA_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep the replica SQLite file in sync with the primary by copying it with SQLite's "
+        "online backup API every --interval seconds. Readers of the replica keep their "
+        "connections and see each copy once it is complete. Every copy is of the whole "
+        "database and holds a read transaction on the primary while it runs, so the cost "
+        "grows with its size: fine up to a few hundred MB; beyond that, raise --interval "
+        "or use a replication tool such as Litestream instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.SQLITE_REPLICA_SYNC_INTERVAL)
+        parser.add_argument('--once', action='store_true', help="Copy once and exit.")
+
+    def handle(self, *args, **options):
+        if REPLICA_DB_ALIAS not in settings.DATABASES:
+            raise CommandError("No replica database is configured; set SQLITE_REPLICA_PATH.")
+        primary = sqlite3.connect(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'], timeout=20)
+        replica = sqlite3.connect(settings.DATABASES[REPLICA_DB_ALIAS]['NAME'], timeout=20)
+        # In WAL mode, reads of the replica carry on against the previous copy while the next one is written.
+        replica.execute('PRAGMA journal_mode=WAL')
+
+        stop_event = threading.Event()
+        if not options['once']:
+            def stop(signum, frame):
+                stop_event.set()
+
+            signal.signal(signal.SIGINT, stop)
+            signal.signal(signal.SIGTERM, stop)
+            self.stdout.write(f"Copying the primary database to the replica every {options['interval']}s.")
+
+        try:
+            while True:
+                start = time.perf_counter()
+                # One step: a consistent snapshot of the primary, which in WAL mode doesn't block its writer.
+                primary.backup(replica)
+                elapsed = time.perf_counter() - start
+                if options['once'] or options['verbosity'] > 1:
+                    pages = replica.execute('PRAGMA page_count').fetchone()[0]
+                    self.stdout.write(f"Copied {pages} pages in {elapsed * 1000:.1f} ms.")
+                if not options['once'] and elapsed > options['interval'] / 2:
+                    self.stderr.write(
+                        f"Copying took {elapsed:.1f}s, over half the {options['interval']}s interval; "
+                        "the database has outgrown full copies at this rate, raise --interval.")
+                if options['once'] or stop_event.wait(max(0.0, options['interval'] - elapsed)):
+                    break
+        finally:
+            primary.close()
+            replica.close()
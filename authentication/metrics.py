@@ -0,0 +1,227 @@
+import contextvars
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds (seconds) of the request latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+KEY_SIZE = 120
+# requests, latency sum, SQL queries, SQL seconds, then one count per bucket plus +Inf.
+VALUE_COUNT = 4 + len(LATENCY_BUCKETS) + 1
+SLOT = struct.Struct(f'{KEY_SIZE}s{VALUE_COUNT}d')
+HEADER = struct.Struct('Q')  # bytes in use
+INITIAL_SIZE = 64 * 1024
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class MetricsFile:
+    """
+    One worker's counters in a memory-mapped file named after its pid.
+
+    Each worker only ever writes its own file, so updates need no locking
+    between processes; the metrics endpoint sums every file in the
+    directory. Files of exited workers are kept so totals never go down.
+    """
+
+    def __init__(self, directory):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / f'worker-{os.getpid()}.db'
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = max(os.fstat(self._fd).st_size, INITIAL_SIZE)
+        os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._offsets = {key: offset for key, offset, _ in read_slots(self._map)}
+        self._used = HEADER.unpack_from(self._map, 0)[0] or HEADER.size
+
+    def _slot(self, key):
+        offset = self._offsets.get(key)
+        if offset is None:
+            offset = self._used
+            if offset + SLOT.size > len(self._map):
+                self._map.resize(len(self._map) * 2)
+            SLOT.pack_into(self._map, offset, key.encode()[:KEY_SIZE], *([0.0] * VALUE_COUNT))
+            self._used = offset + SLOT.size
+            HEADER.pack_into(self._map, 0, self._used)
+            self._offsets[key] = offset
+        return offset
+
+    def observe(self, key, duration, queries, sql_seconds):
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if duration <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            values_at = self._slot(key) + KEY_SIZE
+            for index, delta in ((0, 1), (1, duration), (2, queries), (3, sql_seconds), (4 + bucket, 1)):
+                position = values_at + index * 8
+                (value,) = struct.unpack_from('d', self._map, position)
+                struct.pack_into('d', self._map, position, value + delta)
+
+
+def read_slots(buffer):
+    used = HEADER.unpack_from(buffer, 0)[0]
+    for offset in range(HEADER.size, used, SLOT.size):
+        key, *values = SLOT.unpack_from(buffer, offset)
+        yield key.rstrip(b'\0').decode(), offset, values
+
+
+def collect(directory):
+    """Sum the counters of every worker file in ``directory`` by key."""
+    totals = {}
+    for path in Path(directory).glob('worker-*.db'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            continue
+        for key, _, values in read_slots(data):
+            current = totals.setdefault(key, [0.0] * VALUE_COUNT)
+            for i, value in enumerate(values):
+                current[i] += value
+    return totals
+
+
+def _labels(key):
+    view, method, status = key.split('|')
+    return f'view="{view}",method="{method}",status="{status}"'
+
+
+def render_prometheus(totals):
+    lines = [
+        '# HELP hirehub_requests_total Requests handled, by view, method and status class.',
+        '# TYPE hirehub_requests_total counter',
+    ]
+    lines += [f'hirehub_requests_total{{{_labels(key)}}} {values[0]:g}' for key, values in sorted(totals.items())]
+    lines += [
+        '# HELP hirehub_request_duration_seconds Request latency.',
+        '# TYPE hirehub_request_duration_seconds histogram',
+    ]
+    for key, values in sorted(totals.items()):
+        labels = _labels(key)
+        cumulative = 0.0
+        for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), values[4:]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            lines.append(f'hirehub_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative:g}')
+        lines.append(f'hirehub_request_duration_seconds_sum{{{labels}}} {values[1]:.6f}')
+        lines.append(f'hirehub_request_duration_seconds_count{{{labels}}} {values[0]:g}')
+    lines += [
+        '# HELP hirehub_sql_queries_total SQL statements run while handling requests.',
+        '# TYPE hirehub_sql_queries_total counter',
+    ]
+    lines += [f'hirehub_sql_queries_total{{{_labels(key)}}} {values[2]:g}' for key, values in sorted(totals.items())]
+    lines += [
+        '# HELP hirehub_sql_seconds_total Time spent in SQL statements while handling requests.',
+        '# TYPE hirehub_sql_seconds_total counter',
+    ]
+    lines += [f'hirehub_sql_seconds_total{{{_labels(key)}}} {values[3]:.6f}' for key, values in sorted(totals.items())]
+    return '\n'.join(lines) + '\n'
+
+
+_metrics_file = None
+_metrics_pid = None
+_init_lock = threading.Lock()
+
+
+def get_metrics_file():
+    global _metrics_file, _metrics_pid
+    # Re-open after a fork so each worker gets its own file.
+    if _metrics_pid != os.getpid():
+        with _init_lock:
+            if _metrics_pid != os.getpid():
+                _metrics_file = MetricsFile(settings.METRICS_DIR)
+                _metrics_pid = os.getpid()
+    return _metrics_file
+
+
+class SQLTimer:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+# The timer of the request being handled. A context variable rather than a
+# per-connection wrapper, so that under ASGI it follows the request into the
+# threads sync_to_async() runs its queries in.
+_current_timer = contextvars.ContextVar('sql_timer', default=None)
+
+
+def time_sql(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_sql_timer(sender, connection, **kwargs):
+    if time_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_sql)
+
+
+class RequestMetricsMiddleware:
+    """Record count, latency, SQL statements and SQL time per resolved view."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Connections opened before this module was loaded missed the signal.
+        for connection in connections.all(initialized_only=True):
+            install_sql_timer(None, connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = SQLTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.observe(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = SQLTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self.observe(request, response, time.perf_counter() - start, timer)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration, timer):
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        method = request.method if request.method in METHODS else 'other'
+        key = f'{view}|{method}|{response.status_code // 100}xx'
+        get_metrics_file().observe(key, duration, timer.count, timer.seconds)
@@ -0,0 +1,93 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class MiddlewareChain:
+    """
+    A list of middleware wrapped around ``get_response`` the way Django's
+    handler builds ``MIDDLEWARE``, adapting between sync and async layers
+    only where one can't run the other's way, and keeping each layer's
+    view, exception and template response hooks so the router can call them.
+    """
+
+    def __init__(self, middleware_paths, get_response, is_async=False):
+        adapt = BaseHandler().adapt_method_mode
+        self.view_hooks = []
+        self.exception_hooks = []
+        self.template_response_hooks = []
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for path in reversed(middleware_paths):
+            middleware = import_string(path)
+            if not handler_is_async and getattr(middleware, 'sync_capable', True):
+                middleware_is_async = False
+            else:
+                middleware_is_async = getattr(middleware, 'async_capable', False)
+            try:
+                instance = middleware(adapt(middleware_is_async, handler, handler_is_async))
+            except MiddlewareNotUsed:
+                continue
+            # The router calls the hooks synchronously, as Django does exception hooks.
+            if hasattr(instance, 'process_view'):
+                self.view_hooks.insert(0, adapt(False, instance.process_view))
+            if hasattr(instance, 'process_exception'):
+                self.exception_hooks.append(adapt(False, instance.process_exception))
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_hooks.append(adapt(False, instance.process_template_response))
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+        self.handler = adapt(is_async, handler, handler_is_async)
+
+    def __call__(self, request):
+        return self.handler(request)
+
+
+class PathRoutedMiddleware:
+    """
+    Send requests under FULL_MIDDLEWARE_PREFIXES (admin, allauth and the
+    social login views) through FULL_MIDDLEWARE, and everything else, which
+    is the stateless JWT API, through the shorter API_MIDDLEWARE: no
+    session lookup, CSRF cookie handling, message storage or allauth state.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        # Under ASGI both chains are built async, so async views are reached without a thread hop.
+        is_async = iscoroutinefunction(get_response)
+        self.full = MiddlewareChain(settings.FULL_MIDDLEWARE, get_response, is_async)
+        self.api = MiddlewareChain(settings.API_MIDDLEWARE, get_response, is_async)
+        self.full_prefixes = tuple(settings.FULL_MIDDLEWARE_PREFIXES)
+        if is_async:
+            markcoroutinefunction(self)
+
+    def chain_for(self, request):
+        return self.full if request.path_info.startswith(self.full_prefixes) else self.api
+
+    def __call__(self, request):
+        # In async mode the chain returns a coroutine, which Django awaits.
+        return self.chain_for(request)(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in self.chain_for(request).view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        for hook in self.chain_for(request).exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for hook in self.chain_for(request).template_response_hooks:
+            response = hook(request, response)
+        return response
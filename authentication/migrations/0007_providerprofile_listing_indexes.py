@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_providerprofile_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='providerprofile',
+            index=models.Index(condition=models.Q(('is_profile_complete', True)), fields=['hourly_rate', 'id'], name='provider_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='providerprofile',
+            index=models.Index(condition=models.Q(('is_profile_complete', True)), fields=['id'], name='provider_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='providerprofile',
+            index=models.Index(condition=models.Q(('is_profile_complete', True)), fields=['service_area', 'hourly_rate', 'id'], name='provider_area_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='providerprofile',
+            index=models.Index(condition=models.Q(('is_profile_complete', True)), fields=['service_area', 'id'], name='provider_area_recent_idx'),
+        ),
+    ]
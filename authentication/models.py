@@ -1,6 +1,10 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Lower
 from django.dispatch import receiver
+from django.utils import timezone
+
+from . import geo
 
 USER_TYPE_CHOICES = (
     ('customer', 'Customer'),
@@ -8,7 +12,36 @@ USER_TYPE_CHOICES = (
     ('admin', 'Admin'), 
 )
 
-class CustomUserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def with_email(self, email):
+        """
+        Users whose email matches ``email`` ignoring case, an exact match
+        first. Both sides are lowercased by the database, so the lookup seeks
+        user_email_lower_idx and folds case the same way the index does.
+        """
+        return (
+            self.alias(email_lower=Lower('email'))
+            .filter(email_lower=Lower(models.Value(email)))
+            .order_by(models.Case(models.When(email=email, then=0), default=1), 'id')
+        )
+
+    def get_by_email(self, email):
+        user = self.with_email(email).first()
+        if user is None:
+            raise self.model.DoesNotExist(f"No user with email {email!r}")
+        return user
+
+    async def aget_by_email(self, email):
+        user = await self.with_email(email).afirst()
+        if user is None:
+            raise self.model.DoesNotExist(f"No user with email {email!r}")
+        return user
+
+
+class CustomUserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    def get_by_natural_key(self, username):
+        return self.get_by_email(username)
+
     def create_user(self, email, password=None, user_type=None, **extra_fields):
         if not email:
             raise ValueError("The Email field is required")
@@ -45,9 +78,27 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        # Case-insensitive lookups (UserQuerySet.with_email); the unique
+        # index on email only serves exact matches.
+        indexes = [
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
     def __str__(self):
         return self.email
 
+    @property
+    def profile(self):
+        """The customer or provider profile matching ``user_type``, if it exists."""
+        related_name = {'customer': 'customerprofile', 'provider': 'providerprofile'}.get(self.user_type)
+        if related_name is None:
+            return None
+        try:
+            return getattr(self, related_name)
+        except models.ObjectDoesNotExist:
+            return None
+
 class CustomerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customerprofile')
     phone = models.CharField(max_length=20)
@@ -58,6 +109,50 @@ class CustomerProfile(models.Model):
     def __str__(self):
         return f"CustomerProfile - {self.user.email}"
 
+class ProviderProfileQuerySet(models.QuerySet):
+    def within_cells(self, cells):
+        # Prefix ranges rather than LIKE so SQLite can seek the geohash index.
+        condition = models.Q()
+        for cell in cells:
+            condition |= models.Q(geohash__gte=cell, geohash__lt=cell + '{')
+        return self.filter(condition)
+
+    def nearest(self, latitude, longitude, limit=10, radius_km=None):
+        """
+        Return up to ``limit`` complete profiles closest to the given point as
+        ``(profile, distance_km)`` pairs, nearest first.
+
+        Candidates come from the 3x3 block of geohash cells around the point,
+        widening one precision level at a time until enough profiles are found
+        inside the radius the block is guaranteed to cover.
+        """
+        base = self.filter(is_profile_complete=True).select_related('user')
+        precision = geo.precision_for_radius(radius_km or 1.0, latitude)
+        while True:
+            cells = geo.neighbors(geo.encode(latitude, longitude, precision))
+            covered_km = geo.covered_radius_km(precision, latitude)
+            candidates = []
+            candidates_qs = base.within_cells(cells)
+            if precision > 1:
+                # Drop rows outside the circle's bounding box before they reach Python.
+                lat_bounds, lng_bounds = geo.bounding_box(latitude, longitude, radius_km or covered_km)
+                candidates_qs = candidates_qs.filter(latitude__range=lat_bounds)
+                if lng_bounds:
+                    candidates_qs = candidates_qs.filter(longitude__range=lng_bounds)
+            for profile in candidates_qs:
+                distance = geo.haversine_km(latitude, longitude, profile.latitude, profile.longitude)
+                if radius_km is None or distance <= radius_km:
+                    candidates.append((profile, distance))
+            candidates.sort(key=lambda item: item[1])
+
+            if precision == 1 or (radius_km is not None and covered_km >= radius_km):
+                return candidates[:limit]
+            confirmed = [item for item in candidates if item[1] <= covered_km]
+            if len(confirmed) >= limit:
+                return confirmed[:limit]
+            precision -= 1
+
+
 class ProviderProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='providerprofile')
     skills = models.TextField(blank=True)
@@ -65,7 +160,77 @@ class ProviderProfile(models.Model):
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=0.0)
     location = models.CharField(max_length=100, blank=True)
     is_profile_complete = models.BooleanField(default=False)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
+
+    objects = ProviderProfileQuerySet.as_manager()
+
+    class Meta:
+        # Partial composite indexes for the keyset-paginated listing, which only
+        # shows complete profiles: one per sort order, with and without the
+        # service area filter.
+        indexes = [
+            models.Index(fields=['hourly_rate', 'id'], condition=models.Q(is_profile_complete=True),
+                         name='provider_rate_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_profile_complete=True),
+                         name='provider_recent_idx'),
+            models.Index(fields=['service_area', 'hourly_rate', 'id'], condition=models.Q(is_profile_complete=True),
+                         name='provider_area_rate_idx'),
+            models.Index(fields=['service_area', 'id'], condition=models.Q(is_profile_complete=True),
+                         name='provider_area_recent_idx'),
+        ]
 
     def __str__(self):
         return f"ProviderProfile - {self.user.email}"
 
+    def set_coordinates(self, coordinates):
+        if coordinates is None:
+            self.latitude = self.longitude = None
+            self.geohash = ''
+        else:
+            self.latitude, self.longitude = coordinates
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+
+def default_profile(user):
+    """The empty, unsaved profile every new customer or provider starts with; None for admins."""
+    if user.user_type == 'customer':
+        return CustomerProfile(user=user, phone='', location='')
+    if user.user_type == 'provider':
+        return ProviderProfile(user=user, skills='', service_area='', hourly_rate=0.0, location='')
+    return None
+
+
+class OutgoingEmail(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to_email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the row may next be claimed: the retry time for pending rows and
+    # the lease expiry for rows a worker is currently sending.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"OutgoingEmail - {self.to_email} ({self.status})"
@@ -0,0 +1,163 @@
+import logging
+import random
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(subject, body, to_email):
+    return OutgoingEmail.objects.create(subject=subject, body=body, to_email=to_email)
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due rows to this caller.
+
+    Rows left in ``sending`` by a worker that died are picked up again once
+    their lease has expired, so a restart never drops queued mail. Every
+    claim counts as an attempt, so a message that keeps killing or hanging
+    its worker still fails after EMAIL_OUTBOX_MAX_ATTEMPTS.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.STATUS_SENDING, next_attempt_at__lte=now,
+        attempts__gte=_setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+    ).update(status=OutgoingEmail.STATUS_FAILED, claimed_by='', last_error='Lease expired on the last attempt.')
+
+    due = Q(status=OutgoingEmail.STATUS_PENDING) | Q(status=OutgoingEmail.STATUS_SENDING)
+    candidate_ids = list(
+        OutgoingEmail.objects.filter(due, next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    lease = timedelta(seconds=_setting('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+    # The status/next_attempt_at guard makes the claim safe against another
+    # worker that selected the same candidates.
+    OutgoingEmail.objects.filter(due, id__in=candidate_ids, next_attempt_at__lte=now).update(
+        status=OutgoingEmail.STATUS_SENDING,
+        claimed_by=token,
+        next_attempt_at=now + lease,
+        attempts=F('attempts') + 1,
+    )
+    return list(OutgoingEmail.objects.filter(claimed_by=token, status=OutgoingEmail.STATUS_SENDING))
+
+
+def _retry_delay(attempts):
+    base = _setting('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = _setting('EMAIL_OUTBOX_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _mark_failed_attempt(outgoing, error):
+    # claim_batch() already counted the attempt.
+    outgoing.last_error = str(error)
+    if outgoing.attempts >= _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+        outgoing.status = OutgoingEmail.STATUS_FAILED
+    else:
+        outgoing.status = OutgoingEmail.STATUS_PENDING
+        outgoing.next_attempt_at = timezone.now() + _retry_delay(outgoing.attempts)
+    outgoing.claimed_by = ''
+    outgoing.save(update_fields=['last_error', 'status', 'next_attempt_at', 'claimed_by'])
+
+
+def deliver_batch(batch, mail_connection):
+    """Send a claimed batch over one already opened backend connection."""
+    sent_ids = []
+    try:
+        for outgoing in batch:
+            message = EmailMessage(
+                subject=outgoing.subject,
+                body=outgoing.body,
+                to=[outgoing.to_email],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning("Failed to send email %s to %s: %s", outgoing.pk, outgoing.to_email, e)
+                _mark_failed_attempt(outgoing, e)
+                # The SMTP session is in an unknown state after an error, start a fresh one.
+                mail_connection.close()
+                mail_connection.open()
+            else:
+                sent_ids.append(outgoing.pk)
+    finally:
+        # Even if reconnecting fails part way, what already went out must not
+        # be sent again when the lease on the batch expires.
+        if sent_ids:
+            OutgoingEmail.objects.filter(id__in=sent_ids).update(
+                status=OutgoingEmail.STATUS_SENT,
+                claimed_by='',
+                sent_at=timezone.now(),
+                last_error='',
+            )
+    return len(sent_ids)
+
+
+def drain(batch_size=None, stop_event=None, mail_connection=None):
+    """Deliver due rows until the outbox is empty. Returns the number sent."""
+    batch_size = batch_size or _setting('EMAIL_OUTBOX_BATCH_SIZE', 50)
+    mail_connection = mail_connection or get_connection()
+    sent = 0
+    opened = False
+    try:
+        while not (stop_event and stop_event.is_set()):
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            if not opened:
+                mail_connection.open()
+                opened = True
+            sent += deliver_batch(batch, mail_connection)
+    finally:
+        if opened:
+            mail_connection.close()
+    return sent
+
+
+def _worker_loop(batch_size, poll_interval, stop_event):
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                drain(batch_size, stop_event)
+            except Exception:
+                logger.exception("Email outbox worker failed, retrying in %ss", poll_interval)
+            stop_event.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def run_workers(workers, batch_size, poll_interval, stop_event):
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            args=(batch_size, poll_interval, stop_event),
+            name=f'email-outbox-{i}',
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
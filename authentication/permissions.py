@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+
+
+class HasIntrospectionKey(BasePermission):
+    """Allows requests whose bearer token is one of TOKEN_INTROSPECTION_KEYS."""
+
+    def has_permission(self, request, view):
+        scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not supplied:
+            return False
+        return any(constant_time_compare(supplied, key) for key in settings.TOKEN_INTROSPECTION_KEYS)
@@ -0,0 +1,177 @@
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'authentication.profiling'
+PROFILED_APPS = ('authentication.', 'social_auth.')
+PROJECT_DIRS = ('authentication/', 'social_auth/', 'HireHub/')
+INSTRUMENTATION = ('authentication/metrics.py', 'authentication/profiling.py')
+_sequence = itertools.count()
+
+
+def make_token():
+    """A value for the profiling header, valid for PROFILING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def token_is_valid(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code):
+    filename = code.co_filename
+    for prefix in sorted(filter(None, [str(settings.BASE_DIR), *sys.path]), key=len, reverse=True):
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread: a helper thread records the target
+    thread's stack every ``interval`` seconds. Costs nothing between samples,
+    unlike cProfile, which hooks every call.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+
+def dump_name(url_name, user_type):
+    tags = '.'.join(re.sub(r'[^\w-]', '-', tag) for tag in (url_name, user_type))
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_sequence):04d}.{tags}.folded"
+
+
+def parse_dump_name(name):
+    """Return ``(url_name, user_type)`` from a dump file name."""
+    _, url_name, user_type = Path(name).stem.split('.')
+    return url_name, user_type
+
+
+def is_project_frame(label):
+    path = label.rpartition('(')[2]
+    # The instrumentation middlewares wrap every request; they aren't hot paths.
+    return path.startswith(PROJECT_DIRS) and not path.startswith(INSTRUMENTATION)
+
+
+def write_dump(directory, url_name, user_type, samples):
+    """Write ``samples`` in folded-stack format and drop the oldest dumps past PROFILING_MAX_FILES."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / dump_name(url_name, user_type)
+    path.write_text(''.join(f'{stack} {count}\n' for stack, count in samples.items()))
+    dumps = sorted(directory.glob('*.folded'), key=lambda p: p.stat().st_mtime)
+    for old in dumps[:max(0, len(dumps) - settings.PROFILING_MAX_FILES)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+def read_dump(path):
+    samples = Counter()
+    for line in Path(path).read_text().splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            samples[stack] += int(count)
+    return samples
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profile a HireHub API view when the request carries a valid signed
+    PROFILING_HEADER token (see ``manage.py profiling token``), or at random
+    for a PROFILING_SAMPLE_RATE fraction of requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        sampler = getattr(request, '_stack_sampler', None)
+        if sampler is not None:
+            self.finish(request, sampler)
+        return response
+
+    async def __acall__(self, request):
+        # Async views run on the event loop's thread; process_view is called from another one.
+        request._event_loop_thread = threading.get_ident()
+        response = await self.get_response(request)
+        sampler = getattr(request, '_stack_sampler', None)
+        if sampler is not None:
+            # Stopping joins the sampler thread and writes a file; keep that off the event loop.
+            await sync_to_async(self.finish, thread_sensitive=False)(request, sampler)
+        return response
+
+    @staticmethod
+    def finish(request, sampler):
+        sampler.stop()
+        user = getattr(request, 'user', None)
+        user_type = getattr(user, 'user_type', None) or 'anonymous'
+        write_dump(settings.PROFILING_DIR, request.resolver_match.view_name, user_type, sampler.samples)
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token:
+            return token_is_valid(token)
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not view_func.__module__.startswith(PROFILED_APPS) or not self.should_profile(request):
+            return None
+        # Under ASGI a sync view runs in this thread, an async one on the event
+        # loop, whose samples then include whatever else it is running.
+        thread_id = (request._event_loop_thread if iscoroutinefunction(view_func)
+                     and hasattr(request, '_event_loop_thread') else threading.get_ident())
+        request._stack_sampler = StackSampler(thread_id, settings.PROFILING_INTERVAL)
+        request._stack_sampler.start()
+        return None
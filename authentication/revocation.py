@@ -0,0 +1,253 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, router
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .utils import TTLLRUCache
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SharedRevocationStore:
+    """
+    Revoked JTIs in an SQLite file shared by every worker on the host. Rows
+    get an increasing ``seq`` so each worker can pull only what it hasn't
+    seen yet. Deleting rows bumps the store's ``generation``, which tells
+    workers to rebuild what they pulled from scratch.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS revoked ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, exp INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS revoked_exp ON revoked (exp)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add_many(self, entries):
+        with self.connection() as conn:
+            conn.executemany("INSERT OR IGNORE INTO revoked (jti, exp) VALUES (?, ?)", entries)
+
+    def contains(self, jti):
+        row = self.connection().execute("SELECT 1 FROM revoked WHERE jti = ?", (jti,)).fetchone()
+        return row is not None
+
+    def since(self, seq):
+        return self.connection().execute(
+            "SELECT seq, jti, exp FROM revoked WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+
+    def generation(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return 0 if row is None else int(row[0])
+
+    @staticmethod
+    def _bump_generation(conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    def is_seeded(self, source):
+        """Whether the store was seeded from the database named ``source``."""
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'seeded_from'").fetchone()
+        return row is not None and row[0] == source
+
+    def seed(self, batches, source, timeout=60):
+        """
+        Insert every batch of ``(jti, exp)`` rows and mark the store seeded
+        from ``source``, in one transaction, unless another process has
+        already done so. Rows seeded from any other database are dropped
+        first. Other processes wait up to ``timeout`` seconds for the
+        transaction. If seeding fails nothing is marked, so the next process
+        tries again.
+        """
+        conn = self.connection()
+        conn.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        finally:
+            conn.execute("PRAGMA busy_timeout = 5000")
+        try:
+            if not self.is_seeded(source):
+                if conn.execute("DELETE FROM revoked").rowcount:
+                    self._bump_generation(conn)
+                for batch in batches:
+                    conn.executemany("INSERT OR IGNORE INTO revoked (jti, exp) VALUES (?, ?)", batch)
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [('seeded_from', source), ('warmed_at', str(int(time.time())))])
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def prune(self, now, chunk_size):
+        conn = self.connection()
+        deleted = 0
+        while True:
+            cursor = conn.execute(
+                "DELETE FROM revoked WHERE seq IN (SELECT seq FROM revoked WHERE exp < ? LIMIT ?)",
+                (now, chunk_size))
+            deleted += cursor.rowcount
+            if cursor.rowcount < chunk_size:
+                break
+        if deleted:
+            self._bump_generation(conn)
+        return deleted
+
+
+class RevocationList:
+    """
+    In-memory answer to "is this refresh token revoked?".
+
+    A Bloom filter rules out almost every live token without I/O; the rare
+    possible hit is settled by an exact LRU and then by the shared store.
+    Revocations made by other workers are pulled from the shared store at
+    most every ``sync_interval`` seconds, which bounds how long another
+    worker can keep accepting a freshly revoked token. Once the store has
+    been pruned, the next sync starts the filter over, so pruned JTIs stop
+    producing false positives.
+    """
+
+    def __init__(self, store, capacity, error_rate, lru_size, sync_interval):
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.exact = TTLLRUCache(lru_size)
+        self._last_seq = 0
+        self._last_sync = 0.0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def warm(self):
+        source = self._source()
+        if not self.store.is_seeded(source):
+            self.store.seed(self._unexpired_revocations(), source)
+        self.sync(force=True)
+
+    @staticmethod
+    def _source():
+        """The database the blacklist is read from, so a store seeded from another one is reseeded."""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        return str(connections[router.db_for_read(BlacklistedToken)].settings_dict['NAME'])
+
+    @staticmethod
+    def _unexpired_revocations(batch_size=5000):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        rows = (
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', 'token__expires_at')
+            .iterator(chunk_size=batch_size)
+        )
+        batch = []
+        for jti, expires_at in rows:
+            batch.append((jti, int(expires_at.timestamp())))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        yield batch
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            if not force and now - self._last_sync < self.sync_interval:
+                return
+            generation = self.store.generation()
+            if generation != self._generation:
+                self.bloom = BloomFilter(self.capacity, self.error_rate)
+                self.exact.clear()
+                self._last_seq = 0
+                self._generation = generation
+            for seq, jti, exp in self.store.since(self._last_seq):
+                self._remember(jti, exp)
+                self._last_seq = seq
+            self._last_sync = now
+
+    def _remember(self, jti, exp):
+        self.bloom.add(jti)
+        self.exact.set(jti, True, ttl=max(0, exp - time.time()))
+
+    def revoke(self, jti, exp):
+        self.store.add_many([(jti, int(exp))])
+        self._remember(jti, int(exp))
+
+    def is_revoked(self, jti):
+        self.sync()
+        if jti not in self.bloom:
+            return False
+        cached = self.exact.get(jti)
+        if cached is not None:
+            return cached
+        revoked = self.store.contains(jti)
+        self.exact.set(jti, revoked, ttl=None if revoked else self.sync_interval)
+        return revoked
+
+
+_revocation_list = None
+_init_lock = threading.Lock()
+
+
+def get_revocation_list():
+    global _revocation_list
+    if _revocation_list is None:
+        with _init_lock:
+            if _revocation_list is None:
+                revocation_list = RevocationList(
+                    SharedRevocationStore(settings.TOKEN_REVOCATION_STORE_PATH),
+                    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+                    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+                    lru_size=settings.TOKEN_REVOCATION_LRU_SIZE,
+                    sync_interval=settings.TOKEN_REVOCATION_SYNC_INTERVAL,
+                )
+                revocation_list.warm()
+                _revocation_list = revocation_list
+    return _revocation_list
+
+
+@receiver(setting_changed)
+def reset_revocation_list(setting, **kwargs):
+    """Open the store again under overridden settings, e.g. a temporary TOKEN_REVOCATION_STORE_PATH."""
+    global _revocation_list
+    if setting.startswith('TOKEN_REVOCATION_'):
+        with _init_lock:
+            _revocation_list = None
@@ -0,0 +1,47 @@
+import contextvars
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Set once this request (or thread, outside requests) has written, so its
+# later reads don't miss that write on a replica that hasn't caught up.
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+
+@receiver(request_started)
+def _reset_write_pin(**kwargs):
+    _wrote.set(False)
+
+
+class ReplicaRouter:
+    """
+    Sends reads of the models in REPLICA_READ_MODELS to the ``replica``
+    database, a copy of the primary refreshed by `manage.py
+    sync_sqlite_replica`, and everything else to the primary. Reads stay on
+    the primary inside a transaction there and after the current request
+    has written, so code always sees its own writes; other requests may
+    read data up to SQLITE_REPLICA_SYNC_INTERVAL seconds old.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in settings.REPLICA_READ_MODELS:
+            return DEFAULT_DB_ALIAS
+        if _wrote.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets the schema along with the data.
+        return db == DEFAULT_DB_ALIAS
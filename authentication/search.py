@@ -0,0 +1,141 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.utils.module_loading import import_string
+
+from .models import ProviderProfile
+
+FTS_TABLE = 'authentication_providerprofile_fts'
+
+
+class BaseProviderSearchBackend:
+    def index(self, profile):
+        raise NotImplementedError
+
+    def remove(self, profile_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query='', service_area=None, location=None, min_rate=None, max_rate=None,
+               limit=20, offset=0):
+        """Return the ids of matching complete provider profiles, best match first."""
+        raise NotImplementedError
+
+    def search_profiles(self, **params):
+        ids = self.search(**params)
+        profiles = ProviderProfile.objects.select_related('user').in_bulk(ids)
+        return [profiles[pk] for pk in ids if pk in profiles]
+
+
+class DatabaseSearchBackend(BaseProviderSearchBackend):
+    """Unindexed fallback for databases without a full-text engine."""
+
+    def index(self, profile):
+        pass
+
+    def remove(self, profile_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query='', service_area=None, location=None, min_rate=None, max_rate=None,
+               limit=20, offset=0):
+        qs = ProviderProfile.objects.filter(is_profile_complete=True)
+        for term in re.findall(r'\w+', query):
+            qs = qs.filter(skills__icontains=term)
+        if service_area:
+            qs = qs.filter(service_area__iexact=service_area)
+        if location:
+            qs = qs.filter(location__iexact=location)
+        if min_rate is not None:
+            qs = qs.filter(hourly_rate__gte=min_rate)
+        if max_rate is not None:
+            qs = qs.filter(hourly_rate__lte=max_rate)
+        return list(qs.order_by('id').values_list('id', flat=True)[offset:offset + limit])
+
+
+class SQLiteFTSSearchBackend(BaseProviderSearchBackend):
+    """
+    Ranks providers with an SQLite FTS5 index over skills, service area and
+    location. The index table is created by migration 0005 and keyed by the
+    profile id, so filters and ranking run in a single statement.
+    """
+
+    # bm25 column weights: skills, service_area, location
+    weights = (4.0, 1.0, 1.0)
+
+    def index(self, profile):
+        # In one transaction, so searches never see the profile missing.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [profile.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, skills, service_area, location) VALUES (%s, %s, %s, %s)",
+                [profile.pk, profile.skills, profile.service_area, profile.location],
+            )
+
+    def remove(self, profile_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [profile_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, skills, service_area, location) "
+                f"SELECT id, skills, service_area, location FROM {ProviderProfile._meta.db_table}"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input can never be parsed as FTS5 syntax,
+        # and prefix-match so "plumb" finds "plumbing".
+        terms = re.findall(r'\w+', query)
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def search(self, query='', service_area=None, location=None, min_rate=None, max_rate=None,
+               limit=20, offset=0):
+        match = self.match_expression(query)
+        if not match:
+            return DatabaseSearchBackend().search(
+                '', service_area, location, min_rate, max_rate, limit, offset)
+
+        where = [f"{FTS_TABLE} MATCH %s", "p.is_profile_complete = 1"]
+        params = [match]
+        if service_area:
+            where.append("p.service_area = %s COLLATE NOCASE")
+            params.append(service_area)
+        if location:
+            where.append("p.location = %s COLLATE NOCASE")
+            params.append(location)
+        if min_rate is not None:
+            where.append("p.hourly_rate >= %s")
+            params.append(float(min_rate))
+        if max_rate is not None:
+            where.append("p.hourly_rate <= %s")
+            params.append(float(max_rate))
+
+        weights = ', '.join(str(w) for w in self.weights)
+        sql = (
+            f"SELECT p.id FROM {FTS_TABLE} "
+            f"JOIN {ProviderProfile._meta.db_table} p ON p.id = {FTS_TABLE}.rowid "
+            f"WHERE {' AND '.join(where)} "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s"
+        )
+        # The same database the matching profiles are then read from.
+        with connections[router.db_for_read(ProviderProfile)].cursor() as cursor:
+            cursor.execute(sql, params + [limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = getattr(settings, 'PROVIDER_SEARCH_BACKEND', 'authentication.search.SQLiteFTSSearchBackend')
+    return import_string(path)()
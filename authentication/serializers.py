@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import User, CustomerProfile, ProviderProfile
 from rest_framework.exceptions import AuthenticationFailed
@@ -18,11 +19,23 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['email', 'password', 'user_type']
+        # Replaced by validate_email, which also catches the same address in another case.
+        extra_kwargs = {'email': {'validators': []}}
+
+    def validate_email(self, value):
+        if User.objects.with_email(value).exists():
+            raise serializers.ValidationError("A user with this email already exists.")
+        return value
 
     def create(self, validated_data):
         password = validated_data.pop('password')
+        # Async views hash in the process pool and pass the result to save().
+        encoded_password = validated_data.pop('encoded_password', None)
         user = User(**validated_data)
-        user.set_password(password)
+        if encoded_password:
+            user.password = encoded_password
+        else:
+            user.set_password(password)
         user.save()
         return user
     
@@ -39,8 +52,38 @@ class ProviderProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProviderProfile
-        fields = ['id', 'user', 'skills', 'service_area', 'hourly_rate', 'location', 'is_profile_complete']
-        read_only_fields = ['id', 'user', 'is_profile_complete']
+        fields = ['id', 'user', 'skills', 'service_area', 'hourly_rate', 'location', 'latitude', 'longitude', 'is_profile_complete']
+        read_only_fields = ['id', 'user', 'latitude', 'longitude', 'is_profile_complete']
+
+class ProviderSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, default='')
+    service_area = serializers.CharField(required=False, max_length=100)
+    location = serializers.CharField(required=False, max_length=100)
+    min_rate = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    max_rate = serializers.DecimalField(max_digits=8, decimal_places=2, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+class NearbyProvidersSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0.01, max_value=500, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+class TokenIntrospectionSerializer(serializers.Serializer):
+    tokens = serializers.ListField(child=serializers.CharField(max_length=4096), allow_empty=False)
+
+    def validate_tokens(self, tokens):
+        if len(tokens) > settings.TOKEN_INTROSPECTION_MAX_BATCH:
+            raise serializers.ValidationError(
+                f"At most {settings.TOKEN_INTROSPECTION_MAX_BATCH} tokens per request.")
+        return tokens
+
+class ProviderListSerializer(serializers.Serializer):
+    SORT_CHOICES = ('rate', '-rate', 'newest')
+
+    sort = serializers.ChoiceField(choices=SORT_CHOICES, default='newest')
+    service_area = serializers.CharField(required=False, max_length=100)
 
 class EmailVerificationSerializer(serializers.ModelSerializer):
     token = serializers.CharField(max_length=555)
@@ -61,7 +104,6 @@ class SetNewPasswordSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         try:
-            password = attrs.get('password')
             token = attrs.get('token')
             uidb64 = attrs.get('uidb64')
 
@@ -69,8 +111,17 @@ class SetNewPasswordSerializer(serializers.Serializer):
             user = User.objects.get(id=user_id)
             if not PasswordResetTokenGenerator().check_token(user, token):
                 raise AuthenticationFailed('Invalid reset link', 401)
-            user.set_password(password)
-            user.save()
-            return user
+            attrs['user'] = user
+            return attrs
         except Exception:
             raise AuthenticationFailed('Invalid reset link', 401)
+
+    def create(self, validated_data):
+        user = validated_data['user']
+        encoded_password = validated_data.get('encoded_password')
+        if encoded_password:
+            user.password = encoded_password
+        else:
+            user.set_password(validated_data['password'])
+        user.save(update_fields=['password'])
+        return user
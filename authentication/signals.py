@@ -1,18 +1,58 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import User, CustomerProfile, ProviderProfile
+from .models import User, ProviderProfile, default_profile
+from .search import get_search_backend
+from .revocation import get_revocation_list
+from .cache import PROVIDER_NAMESPACE, USER_NAMESPACE, cache
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        if instance.user_type == 'customer':
-            CustomerProfile.objects.create(user=instance, phone='', location='')
-        elif instance.user_type == 'provider':
-            ProviderProfile.objects.create(
-                user=instance,
-                skills='',
-                service_area='',
-                hourly_rate=0.0,
-                location=''
-            )
+        profile = default_profile(instance)
+        if profile is not None:
+            profile.save(force_insert=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    # After commit, so no other request can re-cache the row as it was before.
+    transaction.on_commit(lambda: cache.delete(USER_NAMESPACE, str(instance.pk)))
+    if instance.user_type == 'provider':
+        transaction.on_commit(lambda: cache.invalidate(PROVIDER_NAMESPACE))
+
+
+@receiver(post_delete, sender=ProviderProfile)
+def invalidate_provider_reads(sender, instance, **kwargs):
+    # Listings and search results only ever show complete profiles.
+    if instance.is_profile_complete:
+        transaction.on_commit(lambda: cache.invalidate(PROVIDER_NAMESPACE))
+
+
+@receiver(post_save, sender=ProviderProfile)
+def index_provider_for_search(sender, instance, **kwargs):
+    # Every save, wherever it comes from: the API, the admin, the shell. Cached
+    # reads are dropped only once the index is current, so no search in between
+    # can cache results from the old index.
+    def reindex():
+        get_search_backend().index(instance)
+        if instance.is_profile_complete:
+            cache.invalidate(PROVIDER_NAMESPACE)
+
+    transaction.on_commit(reindex)
+
+
+@receiver(post_delete, sender=ProviderProfile)
+def remove_provider_from_search_index(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_revocation_list(sender, instance, created, **kwargs):
+    if created:
+        token = instance.token
+        # After commit: a blacklisting that is rolled back must not revoke the token.
+        transaction.on_commit(lambda: get_revocation_list().revoke(token.jti, token.expires_at.timestamp()))
@@ -1,3 +1,399 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .cache import TwoTierCache, cache
+from .models import OutgoingEmail, ProviderProfile, User
+from .outbox import claim_batch, deliver_batch, drain
+from .revocation import RevocationList, SharedRevocationStore
+from .tokens import HireHubRefreshToken
+
+PASSWORD = 'Test-password-123'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class APITestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        tmp = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(
+            TOKEN_REVOCATION_STORE_PATH=os.path.join(tmp, 'revoked_tokens.sqlite3')))
+
+    def setUp(self):
+        # Each test's database starts its ids over.
+        cache.clear()
+        self.client = APIClient()
+
+    @staticmethod
+    def create_user(email, user_type='customer', complete=True, **profile_fields):
+        user = User.objects.create_user(email, PASSWORD, user_type=user_type, is_verified=True)
+        profile = user.profile
+        for field, value in profile_fields.items():
+            setattr(profile, field, value)
+        profile.is_profile_complete = complete
+        profile.save()
+        return user
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {HireHubRefreshToken.for_user(user).access_token}')
+
+    def create_provider(self, email, coordinates=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.create_user(email, user_type='provider', **fields)
+            if coordinates:
+                profile = user.providerprofile
+                profile.set_coordinates(coordinates)
+                profile.save()
+        return user.providerprofile
+
+
+class ProfileETagTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.create_user('etag@example.com', phone='0911000000', location='Bole'))
+        self.url = reverse('complete-customer-profile')
+
+    def test_get_with_current_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_patch_with_stale_etag_fails_precondition(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'location': 'Piassa'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.patch(self.url, {'location': 'Kazanchis'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.get(self.url).data['location'], 'Piassa')
+
+
+class APIMiddlewareTests(APITestCase):
+    def test_browsable_api_cannot_be_framed(self):
+        self.authenticate(self.create_user('framed@example.com'))
+        response = self.client.get(reverse('complete-customer-profile'), HTTP_ACCEPT='text/html')
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertNotIn('sessionid', response.cookies)
+
+
+class ProviderListPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        rates = [30, 10, 20, 10, 40, 20, 10]
+        self.profiles = [self.create_provider(f'provider{i}@example.com', hourly_rate=Decimal(rate))
+                         for i, rate in enumerate(rates)]
+        self.create_provider('incomplete@example.com', complete=False)
+
+    def walk(self, url):
+        """Follow next links from ``url``; return the ids seen and the last page."""
+        ids = []
+        while url:
+            page = self.client.get(url).data
+            ids += [item['id'] for item in page['results']]
+            url = page['next']
+        return ids, page
+
+    def test_next_links_visit_every_complete_profile_once(self):
+        ids, _ = self.walk(reverse('provider-list') + '?page_size=3')
+        self.assertEqual(ids, sorted((p.pk for p in self.profiles), reverse=True))
+
+    def test_rate_ordering_breaks_ties_by_id_and_previous_links_walk_back(self):
+        ids, last_page = self.walk(reverse('provider-list') + '?sort=rate&page_size=2')
+        expected = [p.pk for p in sorted(self.profiles, key=lambda p: (p.hourly_rate, p.pk))]
+        self.assertEqual(ids, expected)
+
+        back = [item['id'] for item in last_page['results']]
+        url = last_page['previous']
+        while url:
+            page = self.client.get(url).data
+            back = [item['id'] for item in page['results']] + back
+            url = page['previous']
+        self.assertEqual(back, expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(reverse('provider-list') + '?cursor=not-a-cursor').status_code, 404)
+
+
+class ProviderSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.plumber = self.create_provider('plumber@example.com', skills='Plumbing, pipe repair',
+                                            service_area='Bole', hourly_rate=Decimal(20))
+        self.electrician = self.create_provider('electrician@example.com', skills='Electrical wiring',
+                                                service_area='Piassa', hourly_rate=Decimal(25))
+        self.create_provider('hidden@example.com', complete=False, skills='Plumbing')
+        self.authenticate(self.create_user('searcher@example.com'))
+
+    def search(self, **params):
+        response = self.client.get(reverse('provider-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_prefix_match_finds_only_complete_profiles(self):
+        self.assertEqual(self.search(q='plumb'), [self.plumber.pk])
+
+    def test_filters(self):
+        self.assertEqual(self.search(q='wiring', service_area='piassa'), [self.electrician.pk])
+        self.assertEqual(self.search(q='wiring', service_area='Bole'), [])
+        self.assertEqual(self.search(min_rate='22'), [self.electrician.pk])
+
+    def test_later_saves_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plumber.skills = 'Carpentry'
+            self.plumber.save()
+        self.assertEqual(self.search(q='plumb'), [])
+        self.assertEqual(self.search(q='carpent'), [self.plumber.pk])
+
+    def test_searches_between_commit_callbacks_cache_nothing_stale(self):
+        self.assertEqual(self.search(q='plumb'), [self.plumber.pk])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.plumber.skills = 'Carpentry'
+            self.plumber.save()
+        # A concurrent search may run after any of them.
+        for callback in callbacks:
+            callback()
+            self.search(q='plumb')
+        self.assertEqual(self.search(q='plumb'), [])
+
+
+class NearbyProvidersTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.near = self.create_provider('near@example.com', coordinates=(9.0100, 38.7600))
+        self.nearer = self.create_provider('nearer@example.com', coordinates=(9.0050, 38.7630))
+        self.far = self.create_provider('far@example.com', coordinates=(8.5500, 39.2700))
+        self.authenticate(self.create_user('finder@example.com'))
+
+    def nearby(self, **params):
+        response = self.client.get(reverse('provider-nearby'), {'lat': 9.0, 'lng': 38.76, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_results_are_ordered_by_distance(self):
+        results = self.nearby(limit=3)
+        self.assertEqual([item['id'] for item in results], [self.nearer.pk, self.near.pk, self.far.pk])
+        distances = [item['distance_km'] for item in results]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[1], 1.11, places=1)
+
+    def test_radius_excludes_distant_providers(self):
+        self.assertEqual([item['id'] for item in self.nearby(radius_km=5)], [self.nearer.pk, self.near.pk])
+
+
+class LogoutTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_user('logout@example.com')
+        response = self.client.post(reverse('login'), {'email': 'logout@example.com', 'password': PASSWORD},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.tokens = response.data
+
+    def test_refresh_after_logout_is_unauthorized(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('logout'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 205)
+
+        self.client.credentials()
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_rolled_back_blacklisting_does_not_revoke(self):
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                HireHubRefreshToken(self.tokens['refresh']).blacklist()
+                raise RuntimeError
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(TOKEN_INTROSPECTION_KEYS=['gateway-key'], TOKEN_INTROSPECTION_MAX_BATCH=4)
+class TokenIntrospectionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        user = self.create_user('introspect@example.com')
+        self.user = user
+        self.refresh = HireHubRefreshToken.for_user(user)
+        self.revoked = HireHubRefreshToken.for_user(user)
+        self.revoked.blacklist()
+        self.url = reverse('token-introspect')
+
+    def introspect(self, tokens, key='gateway-key'):
+        return self.client.post(self.url, {'tokens': tokens}, format='json', HTTP_AUTHORIZATION=f'Bearer {key}')
+
+    def test_requires_a_gateway_key(self):
+        self.assertEqual(self.introspect(['x'], key='wrong').status_code, 403)
+
+    def test_batch_reports_each_token_in_order(self):
+        access = str(self.refresh.access_token)
+        response = self.introspect([str(self.revoked), access, 'not-a-token', str(self.refresh)])
+        self.assertEqual(response.status_code, 200)
+        revoked, access_result, garbage, refresh = response.data['results']
+
+        self.assertEqual((revoked['active'], revoked['revoked']), (False, True))
+        self.assertEqual((access_result['active'], access_result['token_type']), (True, 'access'))
+        self.assertEqual(access_result['user_id'], str(self.user.pk))
+        self.assertEqual(garbage, {'active': False, 'error': 'invalid'})
+        self.assertEqual((refresh['active'], refresh['revoked']), (True, False))
+
+    def test_batch_size_is_limited(self):
+        self.assertEqual(self.introspect([str(self.refresh)] * 5).status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                      'LOCATION': 'two-tier-tests'}})
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = TwoTierCache(lock_timeout=10)
+        self.cache.clear()
+
+    def test_waiters_compute_once_the_holder_fails(self):
+        # Another process holds the lock, then its compute raises and releases it.
+        lock_key = f"lock:{self.cache.make_key('users', 1)}"
+        self.cache.shared.add(lock_key, 1)
+        threading.Timer(0.05, self.cache.shared.delete, [lock_key]).start()
+
+        start = time.monotonic()
+        self.assertEqual(self.cache.get_or_set('users', 1, lambda: 'computed'), 'computed')
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_waiters_take_the_holders_result(self):
+        full_key = self.cache.make_key('users', 1)
+        self.cache.shared.add(f'lock:{full_key}', 1)
+
+        def finish():
+            self.cache.shared.set(full_key, 'stored')
+            self.cache.shared.delete(f'lock:{full_key}')
+
+        threading.Timer(0.05, finish).start()
+        self.assertEqual(self.cache.get_or_set('users', 1, lambda: 'computed'), 'stored')
+
+
+class RevocationStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = os.path.join(tmp, 'revoked_tokens.sqlite3')
+        self.store = SharedRevocationStore(self.path)
+
+    def test_store_seeded_from_another_database_is_reseeded(self):
+        self.store.seed([[('test-jti', 2**40)]], 'test.sqlite3')
+        self.assertTrue(self.store.is_seeded('test.sqlite3'))
+        self.assertFalse(self.store.is_seeded('db.sqlite3'))
+
+        self.store.seed([[('jti', 2**40)]], 'db.sqlite3')
+        self.assertTrue(self.store.is_seeded('db.sqlite3'))
+        self.assertTrue(self.store.contains('jti'))
+        self.assertFalse(self.store.contains('test-jti'))
+
+    def test_seeding_once_per_database(self):
+        self.store.seed([[('jti', 2**40)]], 'db.sqlite3')
+        self.store.seed([[('other-jti', 2**40)]], 'db.sqlite3')
+        self.assertFalse(self.store.contains('other-jti'))
+
+    def test_workers_drop_pruned_entries_on_their_next_sync(self):
+        revocation_list = RevocationList(self.store, capacity=1000, error_rate=0.001, lru_size=100, sync_interval=0)
+        revocation_list.revoke('expired', 1000)
+        revocation_list.revoke('live', 2**40)
+        self.assertIn('expired', revocation_list.bloom)
+
+        # Pruned by another process, e.g. prune_revoked_tokens.
+        self.assertEqual(SharedRevocationStore(self.path).prune(2000, chunk_size=10), 1)
+        self.assertFalse(revocation_list.is_revoked('expired'))
+        self.assertNotIn('expired', revocation_list.bloom)
+        self.assertTrue(revocation_list.is_revoked('live'))
+
+
+class FailingConnection:
+    """A mail connection whose ``fail_on``-th send raises, and whose reconnects may fail too."""
+
+    def __init__(self, fail_on, reconnect_fails=False):
+        self.fail_on = fail_on
+        self.reconnect_fails = reconnect_fails
+        self.sends = 0
+
+    def send_messages(self, messages):
+        self.sends += 1
+        if self.sends == self.fail_on:
+            raise OSError('connection reset')
+        return len(messages)
+
+    def open(self):
+        if self.reconnect_fails:
+            raise OSError('connection refused')
+
+    def close(self):
+        pass
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTests(APITestCase):
+    def test_registration_email_is_queued_on_commit_and_delivered(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('register'), {
+                'email': 'new@example.com', 'password': PASSWORD, 'user_type': 'customer'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(drain(mail_connection=get_connection()), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_SENT)
+
+    def test_failed_send_is_retried_later(self):
+        for i in range(3):
+            OutgoingEmail.objects.create(subject='Hi', body='Hello', to_email=f'user{i}@example.com')
+        self.assertEqual(deliver_batch(claim_batch(10), FailingConnection(fail_on=2)), 2)
+
+        failed = OutgoingEmail.objects.get(to_email='user1@example.com')
+        self.assertEqual((failed.status, failed.attempts), (OutgoingEmail.STATUS_PENDING, 1))
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.STATUS_SENT).count(), 2)
+        # Not due again until its retry delay has passed.
+        self.assertEqual(claim_batch(10), [])
+
+    def test_sent_rows_are_recorded_when_reconnecting_fails(self):
+        for i in range(3):
+            OutgoingEmail.objects.create(subject='Hi', body='Hello', to_email=f'user{i}@example.com')
+        with self.assertRaises(OSError):
+            deliver_batch(claim_batch(10), FailingConnection(fail_on=2, reconnect_fails=True))
+        self.assertEqual(OutgoingEmail.objects.get(to_email='user0@example.com').status, OutgoingEmail.STATUS_SENT)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_expired_leases_count_as_attempts(self):
+        outgoing = OutgoingEmail.objects.create(subject='Hi', body='Hello', to_email='user@example.com')
+        for attempts in (1, 2):
+            self.assertEqual([row.attempts for row in claim_batch(10)], [attempts])
+            # The worker dies or hangs until its lease runs out.
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(claim_batch(10), [])
+        outgoing.refresh_from_db()
+        self.assertEqual((outgoing.status, outgoing.attempts), (OutgoingEmail.STATUS_FAILED, 2))
+
+
+class RegistrationTests(APITestCase):
+    def test_email_differing_only_in_case_is_taken(self):
+        self.create_user('alice@example.com')
+        response = self.client.post(reverse('register'), {
+            'email': 'Alice@example.com', 'password': PASSWORD, 'user_type': 'customer'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_provider_profile_is_created(self):
+        response = self.client.post(reverse('register'), {
+            'email': 'bob@example.com', 'password': PASSWORD, 'user_type': 'provider'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ProviderProfile.objects.filter(user__email='bob@example.com').exists())
@@ -0,0 +1,120 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .keyring import get_token_backend
+from .revocation import get_revocation_list
+
+
+def add_profile_claims(token, user, profile_complete=None):
+    if profile_complete is None:
+        profile = user.profile
+        profile_complete = bool(profile and profile.is_profile_complete)
+    token['user_type'] = user.user_type
+    token['is_verified'] = user.is_verified
+    token['profile_complete'] = profile_complete
+    return token
+
+
+class KeyRingTokenMixin:
+    """Signs and verifies through the key ring (see authentication.keyring)."""
+
+    @property
+    def token_backend(self):
+        return get_token_backend()
+
+
+class HireHubAccessToken(KeyRingTokenMixin, AccessToken):
+    pass
+
+
+class HireHubRefreshToken(KeyRingTokenMixin, RefreshToken):
+    """
+    Refresh token carrying ``user_type``, ``is_verified`` and
+    ``profile_complete`` claims. The access token derived from it copies them,
+    which lets ``StatelessJWTAuthentication`` answer requests without a
+    ``User`` query.
+    """
+
+    access_token_class = HireHubAccessToken
+
+    @classmethod
+    def for_user(cls, user, profile_complete=None):
+        token = super().for_user(user)
+        return add_profile_claims(token, user, profile_complete)
+
+    def check_blacklist(self):
+        # Answered from the in-memory revocation list instead of a
+        # BlacklistedToken query; blacklisting still writes the table, and a
+        # post_save signal feeds each new row into the shared store.
+        if get_revocation_list().is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+    def outstand(self):
+        # Same as simplejwt's, minus the User SELECT: callers (refresh,
+        # logout) have already established that the user exists.
+        return OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            },
+        )
+
+    def blacklist(self):
+        token, _ = self.outstand()
+        return BlacklistedToken.objects.get_or_create(token=token)
+
+
+class HireHubTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = HireHubRefreshToken
+
+
+def introspect(raw_tokens):
+    """
+    Validity, expiry, user and revocation status of each access or refresh
+    token, in order. Repeated tokens are decoded once, and revocation of all
+    the refresh tokens is settled with a single blacklist query.
+    """
+    backend = get_token_backend()
+    results = {}
+    for raw in dict.fromkeys(raw_tokens):
+        try:
+            payload = backend.decode(raw)
+        except TokenBackendExpiredToken:
+            results[raw] = {'active': False, 'error': 'expired'}
+            continue
+        except TokenBackendError:
+            results[raw] = {'active': False, 'error': 'invalid'}
+            continue
+        token_type = payload.get(api_settings.TOKEN_TYPE_CLAIM)
+        if token_type not in ('access', 'refresh') or 'exp' not in payload or api_settings.JTI_CLAIM not in payload:
+            results[raw] = {'active': False, 'error': 'invalid'}
+            continue
+        results[raw] = {
+            'active': True,
+            'token_type': token_type,
+            'jti': payload[api_settings.JTI_CLAIM],
+            'exp': payload['exp'],
+            'user_id': payload.get(api_settings.USER_ID_CLAIM),
+            'user_type': payload.get('user_type'),
+            'revoked': False,
+        }
+
+    # Only refresh tokens are blacklisted; access tokens run until they expire.
+    refresh_jtis = [result['jti'] for result in results.values() if result.get('token_type') == 'refresh']
+    if refresh_jtis:
+        revoked = set(BlacklistedToken.objects.filter(token__jti__in=refresh_jtis)
+                      .values_list('token__jti', flat=True))
+        for result in results.values():
+            if result.get('token_type') == 'refresh' and result['jti'] in revoked:
+                result['active'] = False
+                result['revoked'] = True
+    return [results[raw] for raw in raw_tokens]
@@ -1,26 +1,57 @@
 # urls.py
+from django.conf import settings
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView, 
     CustomerProfileView, 
     ProviderProfileView,
     LoginView,
     LogoutView,
+    TokenIntrospectionView,
     VerifyEmail,
     RequestPasswordResetEmail,
     PasswordTokenCheckAPI,
     SetNewPasswordAPIView,
+    ProviderListView,
+    ProviderSearchView,
+    NearbyProvidersView,
+    CacheStatsView,
+    metrics_view,
+    jwks_view,
 )
+from .async_views import AsyncRegisterView, AsyncLoginView, AsyncSetNewPasswordView
+
+# Under ASGI the async views hash passwords in a process pool instead of on
+# the request thread.
+if settings.ASYNC_PASSWORD_VIEWS:
+    register_view = AsyncRegisterView.as_view()
+    login_view = AsyncLoginView.as_view()
+    set_new_password_view = AsyncSetNewPasswordView.as_view()
+else:
+    register_view = RegisterView.as_view()
+    login_view = LoginView.as_view()
+    set_new_password_view = SetNewPasswordAPIView.as_view()
 
 urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
+    path('register/', register_view, name='register'),
     path('complete-customer-profile/', CustomerProfileView.as_view(), name='complete-customer-profile'),
     path('complete-provider-profile/', ProviderProfileView.as_view(), name='complete-provider-profile'),
-    path('login/', LoginView.as_view(), name='login'),
+    path('login/', login_view, name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('token/introspect/', TokenIntrospectionView.as_view(), name='token-introspect'),
     path('email-verify/', VerifyEmail.as_view(), name="email-verify"),
 
     path('request-reset-email/', RequestPasswordResetEmail.as_view(), name="request-reset-email"),
     path('password-reset/<uidb64>/<token>/', PasswordTokenCheckAPI.as_view(), name='password-reset-confirm'),
-    path('password-reset-complete/', SetNewPasswordAPIView.as_view(), name='password-reset-complete')
+    path('password-reset-complete/', set_new_password_view, name='password-reset-complete'),
+
+    path('providers/', ProviderListView.as_view(), name='provider-list'),
+    path('providers/search/', ProviderSearchView.as_view(), name='provider-search'),
+    path('providers/nearby/', NearbyProvidersView.as_view(), name='provider-nearby'),
+
+    path('internal/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('.well-known/jwks.json', jwks_view, name='jwks'),
 ]
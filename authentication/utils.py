@@ -1,25 +1,102 @@
-from django.core.mail import EmailMessage
+import threading
+import time
+from collections import OrderedDict
 
+from django.conf import settings
+from django.contrib.sites.shortcuts import get_current_site
+from django.db import connection
 
-import threading
+from .outbox import enqueue_email
+
+
+class QueryCounter:
+    """Count the SQL statements run on a connection inside a ``with`` block."""
+
+    def __init__(self, using=None):
+        self.connection = connection if using is None else using
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
 
 
-class EmailThread(threading.Thread):
+class TTLLRUCache:
+    """
+    Thread-safe LRU mapping with a per-entry expiry time. Counts hits and
+    misses so callers can report how effective the cache is.
+    """
 
-    def __init__(self, email):
-        self.email = email
-        threading.Thread.__init__(self)
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
 
-    def run(self):
-        try:
-            self.email.send()
-        except Exception as e:
-            print(f"Failed to send email: {e}")
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
 
 
 class Util:
+    @staticmethod
+    def get_site_domain(request):
+        # SITE_DOMAIN pins the host used in emailed links. Otherwise it is the
+        # request host; the sites framework isn't installed, so that takes no query.
+        if settings.SITE_DOMAIN:
+            return settings.SITE_DOMAIN
+        return get_current_site(request).domain
+
     @staticmethod
     def send_email(data):
-        email = EmailMessage(
-            subject=data['email_subject'], body=data['email_body'], to=[data['to_email']])
-        EmailThread(email).start()
+        # Queued in the outbox table and delivered by `manage.py send_queued_emails`.
+        return enqueue_email(
+            subject=data['email_subject'], body=data['email_body'], to_email=data['to_email'])
@@ -1,21 +1,32 @@
-import jwt
+import hashlib
 import os
 from .utils import Util
+from .keyring import get_keyring, get_token_backend
+from .tokens import HireHubAccessToken, HireHubRefreshToken, add_profile_claims, introspect
+from .permissions import HasIntrospectionKey
+from .search import get_search_backend
+from .geo import geocode
+from .cache import PROVIDER_NAMESPACE, cache, hashed_key
+from .metrics import collect, render_prometheus
+from .pagination import KeysetPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status,views,generics
 from django.urls import reverse
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model, authenticate
 from django.shortcuts import get_object_or_404
-from django.contrib.sites.shortcuts import get_current_site
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework_simplejwt.exceptions import TokenBackendError, TokenBackendExpiredToken
 from .models import CustomerProfile, ProviderProfile
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.conf import settings
-from django.http import HttpResponsePermanentRedirect
-from django.utils.encoding import smart_str, DjangoUnicodeDecodeError
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
+from django.views.decorators.http import require_GET
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import smart_str, smart_bytes, DjangoUnicodeDecodeError
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from .serializers import (
@@ -25,24 +36,29 @@ from .serializers import (
     EmailVerificationSerializer,
     SetNewPasswordSerializer,
     ResetPasswordEmailRequestSerializer,
+    ProviderSearchSerializer,
+    NearbyProvidersSerializer,
+    ProviderListSerializer,
+    TokenIntrospectionSerializer,
 )
 
 User = get_user_model()
 
-class RegisterView(APIView):
-    permission_classes = [AllowAny]
-
-    def post(self, request):
-        serializer = RegisterSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
-
-        current_site = get_current_site(request).domain
+def register_user(request, serializer, **save_kwargs):
+    """
+    Create the user (and, through the post_save signal, its profile) in one
+    transaction and return the response body. The verification email is only
+    queued once that transaction commits.
+    """
+    with transaction.atomic():
+        user = serializer.save(**save_kwargs)
+        # A bare access token is enough for the verification link; unlike a
+        # refresh token it isn't recorded as an OutstandingToken row.
+        access_token = str(add_profile_claims(HireHubAccessToken.for_user(user), user, profile_complete=False))
+
+        current_site = Util.get_site_domain(request)
         relative_link = reverse('email-verify')
-        absurl = f'http://{current_site}{relative_link}?token={access_token}&refresh_token={refresh}'
+        absurl = f'http://{current_site}{relative_link}?token={access_token}'
 
         if user.user_type == 'customer':
             redirect_url = '/complete-customer-profile/'
@@ -57,14 +73,60 @@ class RegisterView(APIView):
             'to_email': user.email,
             'email_subject': 'Verify your email'
         }
-        Util.send_email(email_data)
+        transaction.on_commit(lambda: Util.send_email(email_data))
 
-        return Response({
-            'message': 'User registered successfully',
-            'user_type': user.user_type,
-            'access_token': access_token,
-            'redirect_url': redirect_url
-        }, status=status.HTTP_201_CREATED)
+    return {
+        'message': 'User registered successfully',
+        'user_type': user.user_type,
+        'access_token': access_token,
+        'redirect_url': redirect_url
+    }
+
+class RegisterView(APIView):
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = RegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(register_user(request, serializer), status=status.HTTP_201_CREATED)
+
+def login_payload(user):
+    """Return the login response body and status for an authenticated user."""
+    profile_complete = False
+    redirect_url = '/'
+
+    if user.user_type == 'customer':
+        try:
+            profile = user.customerprofile
+            profile_complete = profile.is_profile_complete
+            redirect_url = '/login/' if profile_complete else '/complete-customer-profile/'
+        except CustomerProfile.DoesNotExist:
+            redirect_url = '/complete-customer-profile/'
+
+    elif user.user_type == 'provider':
+        try:
+            profile = user.providerprofile
+            profile_complete = profile.is_profile_complete
+            redirect_url = '/login/' if profile_complete else '/complete-provider-profile/'
+        except ProviderProfile.DoesNotExist:
+            redirect_url = '/complete-provider-profile/'
+    if not user.is_verified:
+        return {"detail": "Email address is not verified. Please verify your email before proceeding."}, status.HTTP_403_FORBIDDEN
+    
+    if user.user_type in ('customer', 'provider') and not profile_complete:
+        return {"detail": "Please complete your profile to proceed."}, status.HTTP_403_FORBIDDEN
+
+    refresh = HireHubRefreshToken.for_user(user, profile_complete=profile_complete)
+    access_token = str(refresh.access_token)
+
+    return {
+        'refresh': str(refresh),
+        'access': access_token,
+        'user_type': user.user_type,
+        'email': user.email,
+        'profile_complete': profile_complete,
+        'redirect_url': redirect_url,
+    }, status.HTTP_200_OK
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
@@ -73,64 +135,175 @@ class LoginView(APIView):
         email = request.data.get('email')
         password = request.data.get('password')
 
+        # EmailBackend loads the user and its profile in a single query.
         user = authenticate(request, email=email, password=password)
         if user is None:
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
-
-        profile_complete = False
-        redirect_url = '/'
-
-        if user.user_type == 'customer':
-            try:
-                profile = user.customerprofile
-                profile_complete = profile.is_profile_complete
-                redirect_url = '/login/' if profile_complete else '/complete-customer-profile/'
-            except CustomerProfile.DoesNotExist:
-                redirect_url = '/complete-customer-profile/'
-
-        elif user.user_type == 'provider':
-            try:
-                profile = user.providerprofile
-                profile_complete = profile.is_profile_complete
-                redirect_url = '/login/' if profile_complete else '/complete-provider-profile/'
-            except ProviderProfile.DoesNotExist:
-                redirect_url = '/complete-provider-profile/'
-        if not user.is_verified:
-            return Response({"detail": "Email address is not verified. Please verify your email before proceeding."},status=status.HTTP_403_FORBIDDEN)
-        
-        if not profile.is_profile_complete:
-            return Response({"detail": "Please complete your profile to proceed."},status=status.HTTP_403_FORBIDDEN)
 
-        return Response({
-            'refresh': str(refresh),
-            'access': access_token,
-            'user_type': user.user_type,
-            'email': user.email,
-            'profile_complete': profile_complete,
-            'redirect_url': redirect_url,
-        })
-
-class CustomerProfileView(APIView):
+        data, status_code = login_payload(user)
+        return Response(data, status=status_code)
+
+def completed_profile_response(serializer, was_complete):
+    data = serializer.data
+    if not was_complete:
+        # The profile_complete claim in the caller's tokens is now stale.
+        refresh = HireHubRefreshToken.for_user(serializer.instance.user, profile_complete=True)
+        data['refresh'] = str(refresh)
+        data['access'] = str(refresh.access_token)
+    return Response(data, status=status.HTTP_200_OK)
+
+def profile_etag(profile):
+    """Strong ETag over every value the profile serializers render, computed without serializing."""
+    values = [getattr(profile, field.attname) for field in profile._meta.concrete_fields]
+    values += [profile.user.email, profile.user.user_type]
+    return '"%s"' % hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+class ProfileView(APIView):
+    """
+    GET and PATCH of the caller's own profile. GET honours If-None-Match with
+    a 304, and PATCH honours If-Match with a 412 so concurrent edits don't
+    silently overwrite each other.
+    """
     permission_classes = [IsAuthenticated]
+    model = None
+    serializer_class = None
+
+    def get_profile(self, request, for_update=False):
+        # Always the primary: a client must see its own updates.
+        queryset = self.model.objects.using(DEFAULT_DB_ALIAS).select_related('user')
+        if for_update:
+            queryset = queryset.select_for_update(of=('self',))
+        return get_object_or_404(queryset, user_id=request.user.id)
+
+    @staticmethod
+    def with_etag(response, etag):
+        response['ETag'] = etag
+        # Per-user resource behind one URL: shared caches must not reuse it and
+        # clients must revalidate before reusing their copy.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def get(self, request):
+        profile = self.get_profile(request)
+        etag = profile_etag(profile)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self.serializer_class(profile).data, status=status.HTTP_200_OK)
+        return self.with_etag(response, etag)
 
     def patch(self, request):
-        profile = get_object_or_404(CustomerProfile, user=request.user)
-        serializer = CustomerProfileSerializer(profile, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            # Locked until commit, so nobody can change the row between the If-Match check and the save.
+            profile = self.get_profile(request, for_update=True)
+            response = get_conditional_response(request, etag=profile_etag(profile))
+            if response is not None:
+                return response
+            was_complete = profile.is_profile_complete
+            serializer = self.serializer_class(profile, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return self.with_etag(completed_profile_response(serializer, was_complete), profile_etag(profile))
+
+    def perform_update(self, serializer):
         serializer.save(is_profile_complete=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
-class ProviderProfileView(APIView):
+class CustomerProfileView(ProfileView):
+    model = CustomerProfile
+    serializer_class = CustomerProfileSerializer
+
+class ProviderProfileView(ProfileView):
+    model = ProviderProfile
+    serializer_class = ProviderProfileSerializer
+
+    def perform_update(self, serializer):
+        if 'location' in serializer.validated_data:
+            serializer.instance.set_coordinates(geocode(serializer.validated_data['location']))
+        super().perform_update(serializer)
+
+class ProviderListView(generics.ListAPIView):
+    """Complete provider profiles, newest first or by hourly rate, with cursor pagination."""
+    permission_classes = [AllowAny]
+    serializer_class = ProviderProfileSerializer
+    pagination_class = KeysetPagination
+    orderings = {
+        'rate': ('hourly_rate', 'id'),
+        '-rate': ('-hourly_rate', '-id'),
+        # Ids are assigned in creation order, so they double as recency.
+        'newest': ('-id',),
+    }
+
+    def get_params(self):
+        if not hasattr(self, '_params'):
+            params = ProviderListSerializer(data=self.request.query_params)
+            params.is_valid(raise_exception=True)
+            self._params = params.validated_data
+        return self._params
+
+    def get_ordering(self):
+        return self.orderings[self.get_params()['sort']]
+
+    def get_queryset(self):
+        queryset = ProviderProfile.objects.filter(is_profile_complete=True).select_related('user')
+        service_area = self.get_params().get('service_area')
+        if service_area:
+            queryset = queryset.filter(service_area=service_area)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Pages are the same for every caller; any change to a listed profile
+        # invalidates the whole provider namespace.
+        data = cache.get_or_set(
+            PROVIDER_NAMESPACE, hashed_key('list', request.build_absolute_uri()),
+            lambda: super(ProviderListView, self).list(request, *args, **kwargs).data,
+            timeout=settings.PROVIDER_CACHE_TTL)
+        return Response(data, status=status.HTTP_200_OK)
+
+class ProviderSearchView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def patch(self, request):
-        profile = get_object_or_404(ProviderProfile, user=request.user)
-        serializer = ProviderProfileSerializer(profile, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save(is_profile_complete=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def get(self, request):
+        params = ProviderSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        results = cache.get_or_set(
+            PROVIDER_NAMESPACE, hashed_key('search', sorted(data.items())),
+            lambda: self.search(data), timeout=settings.PROVIDER_CACHE_TTL)
+        return Response({
+            'results': results,
+            'limit': data['limit'],
+            'offset': data['offset'],
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def search(data):
+        profiles = get_search_backend().search_profiles(
+            query=data['q'],
+            service_area=data.get('service_area'),
+            location=data.get('location'),
+            min_rate=data.get('min_rate'),
+            max_rate=data.get('max_rate'),
+            limit=data['limit'],
+            offset=data['offset'],
+        )
+        return ProviderProfileSerializer(profiles, many=True).data
+
+class NearbyProvidersView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = NearbyProvidersSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        nearest = ProviderProfile.objects.nearest(
+            data['lat'], data['lng'], limit=data['limit'], radius_km=data.get('radius_km'))
+
+        results = []
+        for profile, distance in nearest:
+            item = ProviderProfileSerializer(profile).data
+            item['distance_km'] = round(distance, 3)
+            results.append(item)
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
@@ -138,13 +311,27 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get("refresh")
-            token = RefreshToken(refresh_token)
+            token = HireHubRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful."}, status=status.HTTP_205_RESET_CONTENT)
         except Exception:
             return Response({"detail": "Invalid token."}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TokenIntrospectionView(APIView):
+    """
+    Lets API gateways check up to TOKEN_INTROSPECTION_MAX_BATCH access or
+    refresh tokens per request. Results come back in the order of ``tokens``.
+    """
+    authentication_classes = []
+    permission_classes = [HasIntrospectionKey]
+
+    def post(self, request):
+        serializer = TokenIntrospectionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': introspect(serializer.validated_data['tokens'])}, status=status.HTTP_200_OK)
+
+
 class VerifyEmail(views.APIView):
     serializer_class = EmailVerificationSerializer
 
@@ -159,7 +346,9 @@ class VerifyEmail(views.APIView):
             return Response({'error': 'Token is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+            # Through the token backend, so links signed by any key still in
+            # the key ring (or by SECRET_KEY, before it) keep working.
+            payload = get_token_backend().decode(token)
             user = get_object_or_404(User, id=payload['user_id'])
 
             if not user.is_verified:
@@ -168,10 +357,10 @@ class VerifyEmail(views.APIView):
 
             return Response({'email': 'Successfully activated'}, status=status.HTTP_200_OK)
 
-        except jwt.ExpiredSignatureError:
+        except TokenBackendExpiredToken:
             return Response({'error': 'Activation link expired'}, status=status.HTTP_400_BAD_REQUEST)
 
-        except jwt.InvalidTokenError:
+        except TokenBackendError:
             return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
 
 class RequestPasswordResetEmail(generics.GenericAPIView):
@@ -182,12 +371,15 @@ class RequestPasswordResetEmail(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
 
         email = serializer.validated_data['email']
-        user = User.objects.filter(email=email).first()
+        try:
+            user = User.objects.get_by_email(email)
+        except User.DoesNotExist:
+            user = None
 
         if user:
             uidb64 = urlsafe_base64_encode(smart_bytes(user.id))
             token = PasswordResetTokenGenerator().make_token(user)
-            current_site = get_current_site(request).domain
+            current_site = Util.get_site_domain(request)
             relative_link = reverse('password-reset-confirm', kwargs={'uidb64': uidb64, 'token': token})
 
             redirect_url = request.data.get('redirect_url', '')
@@ -234,3 +426,33 @@ class SetNewPasswordAPIView(generics.GenericAPIView):
         serializer.save()
 
         return Response({'success': True, 'message': 'Password reset successful'}, status=status.HTTP_200_OK)
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of this worker process's cache, per namespace."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'cache': cache.stats()}, status=status.HTTP_200_OK)
+
+def metrics_view(request):
+    """Request metrics of every worker on this host, in Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    elif not settings.DEBUG:
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(render_prometheus(collect(settings.METRICS_DIR)),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@require_GET
+def jwks_view(request):
+    """Public keys that verify our access and refresh tokens, for other services."""
+    body, etag = get_keyring().jwks()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.JWT_JWKS_MAX_AGE)
+    return response
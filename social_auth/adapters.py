@@ -1,7 +1,18 @@
-from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
+import jwt
+from allauth.socialaccount.adapter import DefaultSocialAccountAdapter, get_adapter
+from allauth.socialaccount.internal import jwtkit
+from allauth.socialaccount.providers.facebook.constants import GRAPH_API_URL
+from allauth.socialaccount.providers.facebook.flows import compute_appsecret_proof
+from allauth.socialaccount.providers.facebook.views import FacebookOAuth2Adapter
+from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
+from allauth.socialaccount.providers.oauth2.client import OAuth2Error
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from allauth.account.utils import user_email
 
+from authentication.cache import SOCIAL_NAMESPACE, cache, hashed_key
+from .jwks import get_jwks_cache, verify_id_token
+
 User = get_user_model()
 
 class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
@@ -14,7 +25,7 @@ class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
             return
 
         try:
-            user = User.objects.get(email__iexact=email)
+            user = User.objects.get_by_email(email)
 
             sociallogin.connect(request, user)
 
@@ -34,3 +45,66 @@ class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
             user.save(update_fields=["is_verified"])
 
         return user
+
+
+def cached_profile(provider_id, app, access_token, fetch):
+    """
+    Profile data for ``access_token`` from ``fetch()``, cached for
+    SOCIAL_PROFILE_CACHE_TTL seconds under a hash of the token, so a client
+    retrying or repeating a login doesn't wait on the provider again.
+    """
+    ttl = settings.SOCIAL_PROFILE_CACHE_TTL
+    if not ttl:
+        return fetch()
+    return cache.get_or_set(SOCIAL_NAMESPACE, hashed_key(provider_id, app.client_id, access_token), fetch, timeout=ttl)
+
+
+class CachedGoogleOAuth2Adapter(GoogleOAuth2Adapter):
+    """
+    Verifies ID tokens against a cached copy of Google's signing keys (see
+    social_auth.jwks) instead of downloading them on every login, and caches
+    userinfo lookups per access token.
+    """
+
+    @property
+    def identity_url(self):
+        return settings.GOOGLE_USERINFO_URL
+
+    def _decode_id_token(self, app, id_token):
+        if self.did_fetch_access_token:
+            # Received straight from Google over TLS; allauth skips the signature check.
+            return super()._decode_id_token(app, id_token)
+        try:
+            data = verify_id_token(id_token, get_jwks_cache(settings.GOOGLE_JWKS_URL),
+                                   audience=app.client_id, issuers=settings.GOOGLE_ID_TOKEN_ISSUERS)
+        except jwt.PyJWTError as exc:
+            raise OAuth2Error("Invalid id_token") from exc
+        jwtkit.verify_jti(data)
+        return data
+
+    def _fetch_user_info(self, access_token):
+        return cached_profile(self.provider_id, self.get_provider().app, access_token,
+                              lambda: super(CachedGoogleOAuth2Adapter, self)._fetch_user_info(access_token))
+
+
+class CachedFacebookOAuth2Adapter(FacebookOAuth2Adapter):
+    """
+    Facebook access tokens are opaque, so they can only be checked by asking
+    the Graph API; the profile it returns is cached per token.
+    """
+
+    def complete_login(self, request, app, token, **kwargs):
+        provider = self.get_provider()
+
+        def fetch():
+            params = {
+                'fields': ','.join(provider.get_fields()),
+                'access_token': token.token,
+                'appsecret_proof': compute_appsecret_proof(app, token),
+            }
+            with get_adapter().get_requests_session() as session:
+                response = session.get(f"{settings.FACEBOOK_GRAPH_URL or GRAPH_API_URL}/me", params=params)
+                response.raise_for_status()
+                return response.json()
+
+        return provider.sociallogin_from_response(request, cached_profile(self.provider_id, app, token.token, fetch))
@@ -0,0 +1,161 @@
+import datetime
+import json
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+GOOGLE_ISSUER = 'https://accounts.google.com'
+
+
+class StandInIdentityProvider:
+    """
+    Local HTTP server imitating the Google and Facebook endpoints social login
+    talks to, for tests and benchmarks:
+
+    - ``/oauth2/v3/certs``: Google's signing keys as a JWKS, with
+      Cache-Control max-age and an ETag
+    - ``/oauth2/v1/certs``: the same keys as PEM certificates, the format
+      allauth's stock Google adapter downloads
+    - ``/oauth2/v2/userinfo``: Google's userinfo for a Bearer access token
+    - ``/me``: the Facebook Graph API profile for an ``access_token`` parameter
+
+    ``latency`` seconds are added to every response to stand in for the
+    round trip to the real provider; ``hits`` counts requests per path.
+    """
+
+    def __init__(self, latency=0.0, max_age=3600, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.max_age = max_age
+        self.host = host
+        self.port = port
+        self.hits = Counter()
+        self.signing_keys = {}
+        self.profiles = {}
+        self.rotate_key()
+
+    def __enter__(self):
+        idp = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                idp.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stand-in-idp', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def jwks_url(self):
+        return f'{self.url}/oauth2/v3/certs'
+
+    @property
+    def certs_url(self):
+        return f'{self.url}/oauth2/v1/certs'
+
+    @property
+    def userinfo_url(self):
+        return f'{self.url}/oauth2/v2/userinfo'
+
+    def rotate_key(self):
+        """Start signing with a new key. Earlier keys stay published, as Google does during a rotation."""
+        self.kid = secrets.token_hex(8)
+        self.signing_keys[self.kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return self.kid
+
+    def issue_id_token(self, email, audience, expires_in=3600, **claims):
+        now = int(time.time())
+        payload = {
+            'iss': GOOGLE_ISSUER, 'aud': audience, 'sub': self.subject(email), 'email': email,
+            'email_verified': True, 'iat': now, 'exp': now + expires_in, **claims,
+        }
+        return jwt.encode(payload, self.signing_keys[self.kid], algorithm='RS256', headers={'kid': self.kid})
+
+    def issue_access_token(self, email, name='Stand-in User'):
+        token = secrets.token_urlsafe(32)
+        first_name, _, last_name = name.partition(' ')
+        self.profiles[token] = {
+            'id': self.subject(email), 'email': email, 'verified_email': True, 'name': name,
+            'given_name': first_name, 'family_name': last_name, 'first_name': first_name, 'last_name': last_name,
+        }
+        return token
+
+    @staticmethod
+    def subject(email):
+        return str(int.from_bytes(email.encode(), 'big') % 10 ** 20)
+
+    def jwks(self):
+        keys = []
+        for kid, private_key in self.signing_keys.items():
+            jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+            keys.append({**jwk, 'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+        return {'keys': keys}
+
+    def certificates(self):
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'stand-in-idp')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificates = {}
+        for kid, private_key in self.signing_keys.items():
+            certificate = (
+                x509.CertificateBuilder().subject_name(name).issuer_name(name)
+                .public_key(private_key.public_key()).serial_number(x509.random_serial_number())
+                .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1))
+                .sign(private_key, hashes.SHA256())
+            )
+            certificates[kid] = certificate.public_bytes(serialization.Encoding.PEM).decode()
+        return certificates
+
+    def handle(self, request):
+        url = urlsplit(request.path)
+        self.hits[url.path] += 1
+        time.sleep(self.latency)
+        if url.path == '/oauth2/v3/certs':
+            body = self.jwks()
+            etag = '"%s"' % ','.join(sorted(self.signing_keys))
+            if request.headers.get('If-None-Match') == etag:
+                return self.respond(request, 304, None, etag=etag)
+            return self.respond(request, 200, body, etag=etag)
+        if url.path == '/oauth2/v1/certs':
+            return self.respond(request, 200, self.certificates())
+        if url.path == '/oauth2/v2/userinfo':
+            token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        elif url.path == '/me':
+            token = parse_qs(url.query).get('access_token', [''])[0]
+        else:
+            return self.respond(request, 404, {'error': 'not_found'})
+        profile = self.profiles.get(token)
+        if profile is None:
+            return self.respond(request, 401, {'error': 'invalid_token'})
+        return self.respond(request, 200, profile)
+
+    def respond(self, request, status, body, etag=None):
+        data = b'' if body is None else json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(data)))
+        request.send_header('Cache-Control', f'public, max-age={self.max_age}')
+        if etag:
+            request.send_header('ETag', etag)
+        request.end_headers()
+        request.wfile.write(data)
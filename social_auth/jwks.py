@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import jwt
+import requests
+from django.conf import settings
+
+MAX_AGE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)', re.I)
+
+
+def freshness(headers, default):
+    """Seconds a response stays fresh, from Cache-Control max-age minus Age, or Expires."""
+    match = MAX_AGE.search(headers.get('Cache-Control', ''))
+    if match:
+        return max(0, int(match.group(1)) - int(headers.get('Age', 0) or 0))
+    if 'Expires' in headers and 'Date' in headers:
+        try:
+            return max(0, (parsedate_to_datetime(headers['Expires'])
+                           - parsedate_to_datetime(headers['Date'])).total_seconds())
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+class JWKSCache:
+    """
+    An identity provider's signing keys, fetched from its JWKS URL and kept
+    for as long as the response's cache headers allow.
+
+    Once a key set is past ``refresh_ahead`` of its lifetime the next lookup
+    starts a background refetch (conditional on the ETag), so requests only
+    wait for the provider on the very first lookup, or if the keys expired
+    and the provider is down. A key id that isn't in the set triggers one
+    immediate refetch, at most every ``min_refresh_interval`` seconds, to
+    pick up rotated keys without letting bogus tokens hammer the provider.
+    """
+
+    def __init__(self, url, default_max_age=3600, min_refresh_interval=60, refresh_ahead=0.8, timeout=5):
+        self.url = url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.refresh_ahead = refresh_ahead
+        self.timeout = timeout
+        self.keys = {}
+        self.etag = None
+        self.fetched_at = float('-inf')
+        self.refresh_at = 0.0
+        self.expires_at = 0.0
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self, seen=None):
+        """Refetch the keys, unless another thread already did since ``seen`` (a fetched_at value)."""
+        with self._lock:
+            if seen is None or self.fetched_at == seen:
+                try:
+                    self._fetch()
+                except Exception:
+                    # Back off instead of retrying on every lookup while the provider is down.
+                    self.fetched_at = time.monotonic()
+                    self.refresh_at = self.expires_at = self.fetched_at + self.min_refresh_interval
+                    raise
+
+    def _fetch(self):
+        headers = {'If-None-Match': self.etag} if self.etag and self.keys else {}
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        self.fetches += 1
+        now = time.monotonic()
+        self.fetched_at = now
+        if response.status_code != 304:
+            response.raise_for_status()
+            key_set = jwt.PyJWKSet.from_dict(response.json())
+            self.keys = {key.key_id: key for key in key_set.keys if key.key_id}
+            self.etag = response.headers.get('ETag')
+        lifetime = max(freshness(response.headers, self.default_max_age), self.min_refresh_interval)
+        self.refresh_at = now + lifetime * self.refresh_ahead
+        self.expires_at = now + lifetime
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except (requests.RequestException, jwt.PyJWTError, ValueError):
+                # Keep serving the current keys; the next lookup retries.
+                pass
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name='jwks-refresh', daemon=True).start()
+
+    def get_key(self, kid):
+        now = time.monotonic()
+        seen = self.fetched_at
+        if now >= self.expires_at:
+            try:
+                self.refresh(seen)
+            except (requests.RequestException, jwt.PyJWTError, ValueError):
+                if not self.keys:
+                    raise
+                # The provider is unreachable: rather use slightly stale keys than fail every login.
+        elif now >= self.refresh_at:
+            self._refresh_in_background()
+
+        key = self.keys.get(kid)
+        seen = self.fetched_at
+        if key is None and time.monotonic() - seen >= self.min_refresh_interval:
+            self.refresh(seen)
+            key = self.keys.get(kid)
+        return key
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_jwks_cache(url):
+    """The process-wide key cache for ``url``."""
+    with _caches_lock:
+        if url not in _caches:
+            _caches[url] = JWKSCache(
+                url,
+                default_max_age=settings.JWKS_DEFAULT_MAX_AGE,
+                min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL,
+            )
+        return _caches[url]
+
+
+def verify_id_token(id_token, jwks, audience, issuers):
+    """Check an OpenID Connect ID token's signature and claims and return its payload."""
+    header = jwt.get_unverified_header(id_token)
+    key = jwks.get_key(header.get('kid'))
+    if key is None:
+        raise jwt.InvalidKeyError(f"Unknown signing key {header.get('kid')!r}")
+    return jwt.decode(
+        id_token,
+        key=key.key,
+        # The key decides the algorithm, never the token header.
+        algorithms=[key.algorithm_name],
+        audience=audience,
+        issuer=issuers,
+        options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']},
+    )
@@ -1,5 +1,14 @@
+from allauth.socialaccount.providers.oauth2.client import OAuth2Error
 from dj_rest_auth.registration.serializers import SocialLoginSerializer
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 class AccessTokenOnlySocialLoginSerializer(SocialLoginSerializer):
     access_token = serializers.CharField(required=True)
+
+    def get_social_login(self, adapter, app, token, response):
+        try:
+            return super().get_social_login(adapter, app, token, response)
+        except OAuth2Error:
+            # e.g. an ID token with a bad signature or audience; a 400, not a 500.
+            raise serializers.ValidationError(_('Incorrect value'))
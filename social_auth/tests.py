@@ -1,3 +1,71 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase
+
+from .jwks import JWKSCache, freshness
+
+URL = 'https://idp.example.com/certs'
+
+
+def jwk(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+    return {**jwt.algorithms.RSAAlgorithm.to_jwk(key, as_dict=True), 'kid': kid, 'alg': 'RS256', 'use': 'sig'}
+
+
+def response(kids, status_code=200, headers=None):
+    result = mock.Mock(status_code=status_code, headers=headers or {'Cache-Control': 'max-age=3600'})
+    result.json.return_value = {'keys': [jwk(kid) for kid in kids]}
+    return result
+
+
+class JWKSCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('social_auth.jwks.requests.get')
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.jwks = JWKSCache(URL, min_refresh_interval=60)
+
+    def test_keys_are_fetched_once_while_fresh(self):
+        self.get.return_value = response(['a'])
+        self.assertEqual(self.jwks.get_key('a').key_id, 'a')
+        self.assertEqual(self.jwks.get_key('a').key_id, 'a')
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_unknown_kid_refetches_to_pick_up_a_rotated_key(self):
+        self.get.return_value = response(['a'])
+        self.jwks.get_key('a')
+        # Move the last fetch back past the minimum refresh interval.
+        self.jwks.fetched_at -= 61
+
+        self.get.return_value = response(['a', 'b'])
+        self.assertEqual(self.jwks.get_key('b').key_id, 'b')
+        self.assertEqual(self.get.call_count, 2)
+        # The refetch is conditional on the ETag of the previous response, if any.
+        self.assertEqual(self.get.call_args.kwargs['headers'], {})
+
+    def test_unknown_kids_refetch_at_most_once_per_interval(self):
+        self.get.return_value = response(['a'])
+        self.jwks.get_key('a')
+        self.assertIsNone(self.jwks.get_key('bogus'))
+        self.assertIsNone(self.jwks.get_key('bogus-2'))
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_not_modified_keeps_the_current_keys(self):
+        self.get.return_value = response(['a'], headers={'Cache-Control': 'max-age=3600', 'ETag': '"v1"'})
+        self.jwks.get_key('a')
+        self.jwks.fetched_at -= 61
+
+        self.get.return_value = response([], status_code=304, headers={'Cache-Control': 'max-age=3600'})
+        self.assertIsNone(self.jwks.get_key('b'))
+        self.assertEqual(self.get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(self.jwks.get_key('a').key_id, 'a')
+
+
+class FreshnessTests(SimpleTestCase):
+    def test_max_age_minus_age(self):
+        self.assertEqual(freshness({'Cache-Control': 'public, max-age=600', 'Age': '100'}, 3600), 500)
+
+    def test_default_without_cache_headers(self):
+        self.assertEqual(freshness({}, 3600), 3600)
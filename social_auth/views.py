@@ -1,13 +1,12 @@
 from dj_rest_auth.registration.views import SocialLoginView
-from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
-from allauth.socialaccount.providers.facebook.views import FacebookOAuth2Adapter
 from rest_framework.response import Response
 from rest_framework import status
+from .adapters import CachedFacebookOAuth2Adapter, CachedGoogleOAuth2Adapter
 from .serializers import AccessTokenOnlySocialLoginSerializer
 
 
 class FacebookLogin(SocialLoginView):
-    adapter_class = FacebookOAuth2Adapter
+    adapter_class = CachedFacebookOAuth2Adapter
     serializer_class = AccessTokenOnlySocialLoginSerializer
 
     def post(self, request, *args, **kwargs):
@@ -38,7 +37,7 @@ class FacebookLogin(SocialLoginView):
 
 
 class GoogleLogin(SocialLoginView):
-    adapter_class = GoogleOAuth2Adapter
+    adapter_class = CachedGoogleOAuth2Adapter
     serializer_class = AccessTokenOnlySocialLoginSerializer
 
     def post(self, request, *args, **kwargs):